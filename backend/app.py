@@ -8,23 +8,25 @@ and admin features.
 import os
 import logging
 import time
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
+# Load environment variables (before our modules read settings at import)
+load_dotenv()
+
 # Import our new modules
-from auth_models import init_db as init_auth_db
+from auth_models import init_db as init_auth_db, create_auth_tables
 from auth_routes import auth_bp
 from views_routes import views_bp
 from keys_routes import keys_bp
 from contact_routes import contact_bp
 from email_service import init_mail
 from security import init_security_middleware
-from database import get_db_connection, get_database_type, init_compliance_database, refresh_latest_bills_materialized_view
-
-# Load environment variables
-load_dotenv()
+from database import get_db_connection, get_database_type, close_request_connection, init_compliance_database
 
 # In-memory cache for stats (additional performance layer)
 _stats_cache = {
@@ -269,9 +271,30 @@ def _warm_stats_cache():
         logger.warning(f"Failed to warm stats cache: {str(e)}")
         # Don't fail startup if cache warming fails
 
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, used by jsonify() and request.get_json().
+
+    Keeps Flask's output: keys stay sorted and datetimes/Decimals still go
+    through Flask's default() (OPT_PASSTHROUGH_DATETIME). Pretty-printed
+    debug output falls back to the stdlib encoder.
+    """
+    options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+               | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.get('indent') is not None:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app():
     """Application factory pattern"""
     flask_app = Flask(__name__)
+    flask_app.json = OrjsonProvider(flask_app)
 
     # Configuration
     flask_app.config['SECRET_KEY'] = os.getenv(
@@ -308,6 +331,17 @@ def create_app():
         'RATELIMIT_STORAGE_URL', 'memory://')
     flask_app.config['RATELIMIT_DEFAULT'] = os.getenv(
         'RATELIMIT_DEFAULT', '100 per hour')
+    # Largest request body accepted (bytes); Werkzeug enforces it while
+    # reading, so even a body sent without Content-Length is never buffered
+    # past this before get_json() gives up
+    flask_app.config['MAX_CONTENT_LENGTH'] = int(
+        os.getenv('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
+
+    # Per-request profiles (cumulative time, top 30) printed to stdout; run
+    # gunicorn with a single worker and thread so the output isn't interleaved
+    if os.getenv('PROFILE_REQUESTS', 'false').lower() == 'true':
+        from werkzeug.middleware.profiler import ProfilerMiddleware
+        flask_app.wsgi_app = ProfilerMiddleware(flask_app.wsgi_app, restrictions=[30])
 
     # Initialize extensions
     JWTManager(flask_app)
@@ -316,8 +350,13 @@ def create_app():
     # Initialize security middleware (includes CORS, rate limiting, etc.)
     flask_app, _ = init_security_middleware(flask_app)
 
+    # Schema setup is idempotent but costs a round-trip per table on every
+    # boot. Deployments that run `flask --app app init-db` as a pre-deploy
+    # step can set RUN_DB_INIT=false to skip it when the web process starts
+    run_db_init = os.getenv('RUN_DB_INIT', 'true').lower() == 'true'
+
     # Initialize auth database
-    init_auth_db(flask_app)
+    init_auth_db(flask_app, create_tables=run_db_init)
 
     # Register blueprints
     flask_app.register_blueprint(auth_bp)
@@ -326,7 +365,21 @@ def create_app():
     flask_app.register_blueprint(contact_bp)
 
     # Initialize main database (existing functionality)
-    init_compliance_database()
+    if run_db_init:
+        init_compliance_database()
+
+    @flask_app.cli.command('init-db')
+    def init_db_command():
+        """Create the auth and compliance schemas and the default admin user."""
+        create_auth_tables(flask_app)
+        if flask_app.config['AUTH_DATABASE_URL'].startswith('postgres'):
+            # create_all() only indexes new tables; build the saved view
+            # indexes on an existing saved_views without blocking writes
+            from optimize_postgres import create_saved_view_indexes
+            create_saved_view_indexes()
+        init_compliance_database()
+    # SQLite: one compliance connection per request, closed on teardown
+    flask_app.teardown_appcontext(close_request_connection)
     
     # Initialize stats cache (warm cache on startup if needed)
     _warm_stats_cache()
@@ -352,15 +405,13 @@ def create_app():
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Count records
-                cursor.execute('SELECT COUNT(*) FROM committees')
-                committee_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM bills')
-                bill_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) FROM bill_compliance')
-                compliance_count = cursor.fetchone()[0]
+                # Count records (one round trip)
+                cursor.execute('''
+                    SELECT (SELECT COUNT(*) FROM committees),
+                           (SELECT COUNT(*) FROM bills),
+                           (SELECT COUNT(*) FROM bill_compliance)
+                ''')
+                committee_count, bill_count, compliance_count = cursor.fetchone()
             
             return jsonify({
                 'status': 'success',
@@ -397,36 +448,22 @@ def create_app():
                 cursor = conn.cursor()
                 logger.info("Database connection established")
                 
-                # Try to insert a test committee
-                if db_type == 'postgresql':
-                    logger.info("Using PostgreSQL INSERT")
-                    cursor.execute(f'''
-                        INSERT INTO committees 
-                        (committee_id, name, chamber, url, updated_at)
-                        VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-                        ON CONFLICT (committee_id) DO UPDATE SET
-                            name = EXCLUDED.name,
-                            updated_at = EXCLUDED.updated_at
-                    ''', (
-                        test_committee_id,
-                        'Test Committee',
-                        'Joint',
-                        'https://example.com',
-                        datetime.utcnow().isoformat() + 'Z'
-                    ))
-                else:
-                    logger.info("Using SQLite INSERT OR REPLACE")
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO committees 
-                        (committee_id, name, chamber, url, updated_at)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        test_committee_id,
-                        'Test Committee',
-                        'Joint',
-                        'https://example.com',
-                        datetime.utcnow().isoformat() + 'Z'
-                    ))
+                # Try to insert a test committee (upsert syntax shared by
+                # PostgreSQL and SQLite)
+                cursor.execute(f'''
+                    INSERT INTO committees 
+                    (committee_id, name, chamber, url, updated_at)
+                    VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+                    ON CONFLICT (committee_id) DO UPDATE SET
+                        name = EXCLUDED.name,
+                        updated_at = EXCLUDED.updated_at
+                ''', (
+                    test_committee_id,
+                    'Test Committee',
+                    'Joint',
+                    'https://example.com',
+                    datetime.utcnow().isoformat() + 'Z'
+                ))
                 
                 logger.info("INSERT executed")
                 
@@ -1917,9 +1954,29 @@ def create_app():
 
 import hashlib
 import hmac
+import itertools
 import time
 import json
 
+# Signatures cover the body re-serialized compactly with the stdlib encoder
+_SIGNATURE_BODY_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+_SIGNATURE_HASH_CHUNKS = 4096
+
+def _signature_body_hash(body):
+    """
+    SHA-256 of json.dumps(body, separators=(",", ":"), ensure_ascii=False),
+    hashed as the encoder produces it. A multi-megabyte cache upload never
+    exists as a second full-size str (plus its UTF-8 bytes) next to the
+    parsed body.
+    """
+    digest = hashlib.sha256()
+    chunks = _SIGNATURE_BODY_ENCODER.iterencode(body)
+    while True:
+        batch = list(itertools.islice(chunks, _SIGNATURE_HASH_CHUNKS))
+        if not batch:
+            return digest.hexdigest()
+        digest.update(''.join(batch).encode("utf-8"))
+
 def verify_ingest_signature(request):
     """
     Verify HMAC signature for ingestion endpoints.
@@ -1961,8 +2018,7 @@ def verify_ingest_signature(request):
         if body is None:
             body = {}
         
-        body_json = json.dumps(body, separators=(",", ":"), ensure_ascii=False)
-        body_hash = hashlib.sha256(body_json.encode("utf-8")).hexdigest()
+        body_hash = _signature_body_hash(body)
         
         # Create message to verify: timestamp.METHOD.path.body_hash
         message = f"{timestamp}.{method}.{path}.{body_hash}"
@@ -1989,12 +2045,99 @@ def verify_ingest_signature(request):
 # Data Import Functions
 # ========================================================================
 
+# Ingest statements, built once. PostgreSQL variants take execute_values'
+# single "VALUES %s"; SQLite variants are executemany'd with ? placeholders.
+# Upserts update rows in place (SQLite's INSERT OR REPLACE would delete and
+# re-insert them, cascading to rows that reference them).
+COMMITTEE_COLUMNS = (
+    'committee_id', 'name', 'chamber', 'url', 'house_room', 'house_address',
+    'house_phone', 'senate_room', 'senate_address', 'senate_phone',
+    'house_chair_name', 'house_chair_email', 'house_vice_chair_name',
+    'house_vice_chair_email', 'senate_chair_name', 'senate_chair_email',
+    'senate_vice_chair_name', 'senate_vice_chair_email', 'updated_at',
+)
+BILL_COLUMNS = ('bill_id', 'bill_title', 'bill_url', 'updated_at')
+BILL_COMPLIANCE_COLUMNS = (
+    'committee_id', 'bill_id', 'hearing_date', 'deadline_60',
+    'effective_deadline', 'extension_order_url', 'extension_date',
+    'reported_out', 'reported_out_date', 'summary_present', 'summary_url',
+    'votes_present', 'votes_url', 'state', 'reason',
+    'notice_status', 'notice_gap_days', 'announcement_date',
+    'scheduled_hearing_date', 'generated_at',
+)
+
+def _ingest_sql(table, columns, conflict_key=None):
+    """(PostgreSQL, SQLite) INSERT for table, upserting on conflict_key if given"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES {{values}}"
+    if conflict_key:
+        sql += f" ON CONFLICT ({conflict_key}) DO UPDATE SET " + ', '.join(
+            f'{col} = EXCLUDED.{col}' for col in columns if col != conflict_key
+        )
+    return sql.format(values='%s'), sql.format(values=f"({', '.join('?' * len(columns))})")
+
+PG_UPSERT_COMMITTEES_SQL, SQLITE_UPSERT_COMMITTEES_SQL = _ingest_sql('committees', COMMITTEE_COLUMNS, 'committee_id')
+PG_UPSERT_BILLS_SQL, SQLITE_UPSERT_BILLS_SQL = _ingest_sql('bills', BILL_COLUMNS, 'bill_id')
+PG_INSERT_BILL_COMPLIANCE_SQL, SQLITE_INSERT_BILL_COMPLIANCE_SQL = _ingest_sql('bill_compliance', BILL_COMPLIANCE_COLUMNS)
+
+def _cache_data_rows(cache_data):
+    """
+    Build the committee and bill row tuples for import_cache_data() up front,
+    so the write transaction only has to run the batched statements.
+    
+    Returns:
+        tuple: (committees_tuples, bills_tuples); either list may be empty
+    """
+    now = datetime.utcnow().isoformat() + 'Z'
+    
+    committee_rows = (
+        (
+            comm_data.get('committee_id', comm_id),
+            comm_data.get('name', ''),
+            comm_data.get('chamber', 'Joint'),
+            comm_data.get('url', ''),
+            comm_data.get('house_room'),
+            comm_data.get('house_address'),
+            comm_data.get('house_phone'),
+            comm_data.get('senate_room'),
+            comm_data.get('senate_address'),
+            comm_data.get('senate_phone'),
+            comm_data.get('house_chair_name', ''),
+            comm_data.get('house_chair_email', ''),
+            comm_data.get('house_vice_chair_name', ''),
+            comm_data.get('house_vice_chair_email', ''),
+            comm_data.get('senate_chair_name', ''),
+            comm_data.get('senate_chair_email', ''),
+            comm_data.get('senate_vice_chair_name', ''),
+            comm_data.get('senate_vice_chair_email', ''),
+            comm_data.get('updated_at', now)
+        )
+        for comm_id, comm_data in cache_data.get('committee_contacts', {}).items()
+    )
+    # Keyed by committee_id so a repeated id keeps its last row, as
+    # row-by-row upserts did (a single ON CONFLICT statement can't
+    # touch the same row twice)
+    committees_tuples = list({row[0]: row for row in committee_rows}.values())
+    
+    bills_tuples = []
+    for bill_id, bill_data in cache_data.get('bill_parsers', {}).items():
+        title = bill_data.get('title', {})
+        if isinstance(title, dict):
+            bills_tuples.append((bill_id, title.get('value'), bill_data.get('bill_url'), title.get('updated_at')))
+        else:
+            bills_tuples.append((bill_id, title, bill_data.get('bill_url'), now))
+    
+    return committees_tuples, bills_tuples
+
 def import_cache_data(cache_data):
     """Import data from cache.json structure"""
     logger = logging.getLogger(__name__)
     logger.info(f"Starting cache data import. DB type: {get_database_type()}")
     
-    with get_db_connection() as conn:
+    # Row tuples are built before the write transaction opens
+    committees_tuples, bills_tuples = _cache_data_rows(cache_data)
+    
+    # One write transaction for the whole import
+    with get_db_connection(write=True) as conn:
         cursor = conn.cursor()
         
         try:
@@ -2003,126 +2146,28 @@ def import_cache_data(cache_data):
             logger.info(f"Using database type: {db_type}, placeholder: {placeholder}")
             
             # Import committees
-            if 'committee_contacts' in cache_data:
-                logger.info(f"Importing {len(cache_data['committee_contacts'])} committees")
-                for comm_id, comm_data in cache_data['committee_contacts'].items():
-                    if db_type == 'postgresql':
-                        # PostgreSQL: Use INSERT ... ON CONFLICT ... DO UPDATE
-                        cursor.execute(f'''
-                            INSERT INTO committees 
-                            (committee_id, name, chamber, url, house_room, house_address, house_phone,
-                             senate_room, senate_address, senate_phone, house_chair_name, house_chair_email,
-                             house_vice_chair_name, house_vice_chair_email, senate_chair_name, senate_chair_email,
-                             senate_vice_chair_name, senate_vice_chair_email, updated_at)
-                            VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder}, 
-                                    {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder},
-                                    {placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder},
-                                    {placeholder}, {placeholder}, {placeholder}, {placeholder})
-                            ON CONFLICT (committee_id) DO UPDATE SET
-                                name = EXCLUDED.name,
-                                chamber = EXCLUDED.chamber,
-                                url = EXCLUDED.url,
-                                house_room = EXCLUDED.house_room,
-                                house_address = EXCLUDED.house_address,
-                                house_phone = EXCLUDED.house_phone,
-                                senate_room = EXCLUDED.senate_room,
-                                senate_address = EXCLUDED.senate_address,
-                                senate_phone = EXCLUDED.senate_phone,
-                                house_chair_name = EXCLUDED.house_chair_name,
-                                house_chair_email = EXCLUDED.house_chair_email,
-                                house_vice_chair_name = EXCLUDED.house_vice_chair_name,
-                                house_vice_chair_email = EXCLUDED.house_vice_chair_email,
-                                senate_chair_name = EXCLUDED.senate_chair_name,
-                                senate_chair_email = EXCLUDED.senate_chair_email,
-                                senate_vice_chair_name = EXCLUDED.senate_vice_chair_name,
-                                senate_vice_chair_email = EXCLUDED.senate_vice_chair_email,
-                                updated_at = EXCLUDED.updated_at
-                        ''',
-                        (
-                            comm_data.get('committee_id', comm_id),
-                            comm_data.get('name', ''),
-                            comm_data.get('chamber', 'Joint'),
-                            comm_data.get('url', ''),
-                            comm_data.get('house_room'),
-                            comm_data.get('house_address'),
-                            comm_data.get('house_phone'),
-                            comm_data.get('senate_room'),
-                            comm_data.get('senate_address'),
-                            comm_data.get('senate_phone'),
-                            comm_data.get('house_chair_name', ''),
-                            comm_data.get('house_chair_email', ''),
-                            comm_data.get('house_vice_chair_name', ''),
-                            comm_data.get('house_vice_chair_email', ''),
-                            comm_data.get('senate_chair_name', ''),
-                            comm_data.get('senate_chair_email', ''),
-                            comm_data.get('senate_vice_chair_name', ''),
-                            comm_data.get('senate_vice_chair_email', ''),
-                            comm_data.get('updated_at', datetime.utcnow().isoformat() + 'Z')
-                        ))
-                    else:
-                        # SQLite: Use INSERT OR REPLACE
-                        cursor.execute(
-                            'INSERT OR REPLACE INTO committees '
-                            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '
-                            '?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                            (
-                                comm_data.get('committee_id', comm_id),
-                                comm_data.get('name', ''),
-                                comm_data.get('chamber', 'Joint'),
-                                comm_data.get('url', ''),
-                                comm_data.get('house_room'),
-                                comm_data.get('house_address'),
-                                comm_data.get('house_phone'),
-                                comm_data.get('senate_room'),
-                                comm_data.get('senate_address'),
-                                comm_data.get('senate_phone'),
-                                comm_data.get('house_chair_name', ''),
-                                comm_data.get('house_chair_email', ''),
-                                comm_data.get('house_vice_chair_name', ''),
-                                comm_data.get('house_vice_chair_email', ''),
-                                comm_data.get('senate_chair_name', ''),
-                                comm_data.get('senate_chair_email', ''),
-                                comm_data.get('senate_vice_chair_name', ''),
-                                comm_data.get('senate_vice_chair_email', ''),
-                                comm_data.get('updated_at', datetime.utcnow().isoformat() + 'Z')
-                            ))
+            if committees_tuples:
+                logger.info(f"Importing {len(committees_tuples)} committees")
+                if db_type == 'postgresql':
+                    # PostgreSQL: one multi-row INSERT ... ON CONFLICT ... DO UPDATE
+                    from psycopg2.extras import execute_values
+                    execute_values(cursor, PG_UPSERT_COMMITTEES_SQL, committees_tuples)
+                else:
+                    # SQLite: the same upsert, one prepared statement for all rows
+                    cursor.executemany(SQLITE_UPSERT_COMMITTEES_SQL, committees_tuples)
 
             # Import bills
-            if 'bill_parsers' in cache_data:
-                logger.info(f"Importing {len(cache_data['bill_parsers'])} bills")
-                bills_tuples = []
-                for bill_id, bill_data in cache_data['bill_parsers'].items():
-                    title = bill_data.get('title', {})
-                    bills_tuples.append((
-                        bill_id,
-                        title.get('value') if isinstance(title, dict) else title,
-                        bill_data.get('bill_url'),
-                        title.get('updated_at') if isinstance(title, dict) else datetime.utcnow().isoformat() + 'Z'
-                    ))
-
+            if bills_tuples:
+                logger.info(f"Importing {len(bills_tuples)} bills")
                 if db_type == 'postgresql':
                     from psycopg2.extras import execute_values
-                    execute_values(cursor, '''
-                        INSERT INTO bills (bill_id, bill_title, bill_url, updated_at)
-                        VALUES %s
-                        ON CONFLICT (bill_id) DO UPDATE SET
-                            bill_title = EXCLUDED.bill_title,
-                            bill_url = EXCLUDED.bill_url,
-                            updated_at = EXCLUDED.updated_at
-                    ''', bills_tuples)
+                    execute_values(cursor, PG_UPSERT_BILLS_SQL, bills_tuples)
                 else:
-                    cursor.executemany(
-                        'INSERT OR REPLACE INTO bills (bill_id, bill_title, bill_url, updated_at) '
-                        'VALUES (?, ?, ?, ?)',
-                        bills_tuples
-                    )
+                    cursor.executemany(SQLITE_UPSERT_BILLS_SQL, bills_tuples)
 
             conn.commit()  # Explicit commit
             logger.info("Cache data import completed successfully")
             
-            # Refresh materialized view after data ingest (PostgreSQL optimization)
-            refresh_latest_bills_materialized_view()
-            
             return {
                 "status": "success",
                 "message": "Successfully imported cache data"
@@ -2150,7 +2195,7 @@ def import_changelog_data(data):
     logger.info(f"Starting changelog import for version {data.get('current_version')}")
     
     try:
-        with get_db_connection() as conn:
+        with get_db_connection(write=True) as conn:
             cursor = conn.cursor()
             db_type = get_database_type()
             placeholder = '%s' if db_type == 'postgresql' else '?'
@@ -2444,7 +2489,46 @@ def import_compliance_report(committee_id, bills_data, diff_report=None, analysi
     logger.info(f"Number of bills to import: {len(bills_data)}")
     logger.info(f"Database type: {get_database_type()}")
     
-    with get_db_connection() as conn:
+    # Row tuples are built before the write transaction opens
+    generated_at = datetime.utcnow().isoformat() + 'Z'
+    bills_tuples = [
+        (
+            bill.get('bill_id'),
+            bill.get('bill_title'),
+            bill.get('bill_url'),
+            generated_at,
+        )
+        for bill in bills_data
+    ]
+    compliance_tuples = [
+        (
+            committee_id,
+            bill.get('bill_id'),
+            bill.get('hearing_date'),
+            bill.get('deadline_60'),
+            bill.get('effective_deadline'),
+            bill.get('extension_order_url'),
+            bill.get('extension_date'),
+            1 if bill.get('reported_out') else 0,
+            bill.get('reported_out_date'),
+            1 if bill.get('summary_present') else 0,
+            bill.get('summary_url'),
+            1 if bill.get('votes_present') else 0,
+            bill.get('votes_url'),
+            bill.get('state', 'unknown'),
+            bill.get('reason', ''),
+            bill.get('notice_status'),
+            bill.get('notice_gap_days'),
+            bill.get('announcement_date'),
+            bill.get('scheduled_hearing_date'),
+            generated_at,
+        )
+        for bill in bills_data
+    ]
+    
+    # One write transaction for the whole report, locked from the committee
+    # check onwards
+    with get_db_connection(write=True) as conn:
         cursor = conn.cursor()
         
         try:
@@ -2452,115 +2536,32 @@ def import_compliance_report(committee_id, bills_data, diff_report=None, analysi
             placeholder = '%s' if db_type == 'postgresql' else '?'
             logger.info(f"Using placeholder: {placeholder}")
             
-            # Ensure committee exists (auto-create if needed)
-            logger.info(f"Checking if committee {committee_id} exists...")
-            cursor.execute(f'SELECT COUNT(*) FROM committees WHERE committee_id = {placeholder}', (committee_id,))
-            committee_exists = cursor.fetchone()[0] > 0
-            
-            if not committee_exists:
-                logger.info(f"Committee {committee_id} not found, creating...")
-                if db_type == 'postgresql':
-                    cursor.execute(f'''
-                        INSERT INTO committees 
-                        (committee_id, name, chamber, url, updated_at)
-                        VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
-                        ON CONFLICT (committee_id) DO NOTHING
-                    ''', (
-                        committee_id,
-                        f"Committee {committee_id}",
-                        'Joint',
-                        f"https://malegislature.gov/Committees/{committee_id}",
-                        datetime.utcnow().isoformat() + 'Z'
-                    ))
-                else:
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO committees 
-                        (committee_id, name, chamber, url, updated_at)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        committee_id,
-                        f"Committee {committee_id}",
-                        'Joint',
-                        f"https://malegislature.gov/Committees/{committee_id}",
-                        datetime.utcnow().isoformat() + 'Z'
-                    ))
-                logger.info(f"Committee {committee_id} created")
+            # Ensure committee exists (auto-create if needed) in one statement,
+            # no separate existence check
+            cursor.execute(f'''
+                INSERT INTO committees 
+                (committee_id, name, chamber, url, updated_at)
+                VALUES ({placeholder}, {placeholder}, {placeholder}, {placeholder}, {placeholder})
+                ON CONFLICT (committee_id) DO NOTHING
+            ''', (
+                committee_id,
+                f"Committee {committee_id}",
+                'Joint',
+                f"https://malegislature.gov/Committees/{committee_id}",
+                generated_at
+            ))
+            if cursor.rowcount > 0:
+                logger.info(f"Committee {committee_id} not found, created")
             else:
                 logger.info(f"Committee {committee_id} exists")
             
-            generated_at = datetime.utcnow().isoformat() + 'Z'
-            bills_tuples = [
-                (
-                    bill.get('bill_id'),
-                    bill.get('bill_title'),
-                    bill.get('bill_url'),
-                    generated_at,
-                )
-                for bill in bills_data
-            ]
-            compliance_tuples = [
-                (
-                    committee_id,
-                    bill.get('bill_id'),
-                    bill.get('hearing_date'),
-                    bill.get('deadline_60'),
-                    bill.get('effective_deadline'),
-                    bill.get('extension_order_url'),
-                    bill.get('extension_date'),
-                    1 if bill.get('reported_out') else 0,
-                    bill.get('reported_out_date'),
-                    1 if bill.get('summary_present') else 0,
-                    bill.get('summary_url'),
-                    1 if bill.get('votes_present') else 0,
-                    bill.get('votes_url'),
-                    bill.get('state', 'unknown'),
-                    bill.get('reason', ''),
-                    bill.get('notice_status'),
-                    bill.get('notice_gap_days'),
-                    bill.get('announcement_date'),
-                    bill.get('scheduled_hearing_date'),
-                    generated_at,
-                )
-                for bill in bills_data
-            ]
-
             if db_type == 'postgresql':
                 from psycopg2.extras import execute_values
-                execute_values(cursor, '''
-                    INSERT INTO bills (bill_id, bill_title, bill_url, updated_at)
-                    VALUES %s
-                    ON CONFLICT (bill_id) DO UPDATE SET
-                        bill_title = EXCLUDED.bill_title,
-                        bill_url = EXCLUDED.bill_url,
-                        updated_at = EXCLUDED.updated_at
-                ''', bills_tuples)
-                execute_values(cursor, '''
-                    INSERT INTO bill_compliance (
-                        committee_id, bill_id, hearing_date, deadline_60,
-                        effective_deadline, extension_order_url, extension_date,
-                        reported_out, reported_out_date, summary_present, summary_url,
-                        votes_present, votes_url, state, reason,
-                        notice_status, notice_gap_days, announcement_date,
-                        scheduled_hearing_date, generated_at
-                    ) VALUES %s
-                ''', compliance_tuples)
+                execute_values(cursor, PG_UPSERT_BILLS_SQL, bills_tuples)
+                execute_values(cursor, PG_INSERT_BILL_COMPLIANCE_SQL, compliance_tuples)
             else:
-                cursor.executemany(
-                    'INSERT OR REPLACE INTO bills (bill_id, bill_title, bill_url, updated_at) '
-                    'VALUES (?, ?, ?, ?)',
-                    bills_tuples
-                )
-                cursor.executemany(
-                    'INSERT INTO bill_compliance ('
-                    'committee_id, bill_id, hearing_date, deadline_60, '
-                    'effective_deadline, extension_order_url, extension_date, '
-                    'reported_out, reported_out_date, summary_present, summary_url, '
-                    'votes_present, votes_url, state, reason, '
-                    'notice_status, notice_gap_days, announcement_date, '
-                    'scheduled_hearing_date, generated_at) '
-                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
-                    compliance_tuples
-                )
+                cursor.executemany(SQLITE_UPSERT_BILLS_SQL, bills_tuples)
+                cursor.executemany(SQLITE_INSERT_BILL_COMPLIANCE_SQL, compliance_tuples)
 
             imported_count = len(bills_data)
             logger.info(f"Batch inserted {imported_count} bills and compliance records")
@@ -2575,16 +2576,17 @@ def import_compliance_report(committee_id, bills_data, diff_report=None, analysi
                 scan_date_str = scan_date.isoformat() + 'Z'
                 
                 # Convert bills_data to format needed for diff calculation (used for weekly/monthly)
-                current_bills = []
-                for bill in bills_data:
-                    current_bills.append({
+                current_bills = [
+                    {
                         'bill_id': bill.get('bill_id'),
                         'hearing_date': bill.get('hearing_date'),
                         'reported_out': bool(bill.get('reported_out', False)),
                         'summary_present': bool(bill.get('summary_present', False)),
                         'votes_present': bool(bill.get('votes_present', False)),
                         'state': bill.get('state', 'unknown')
-                    })
+                    }
+                    for bill in bills_data
+                ]
                 
                 # Initialize diff_reports structure
                 diff_reports = {}
@@ -2661,14 +2663,9 @@ def import_compliance_report(committee_id, bills_data, diff_report=None, analysi
             conn.commit()  # Explicit commit
             logger.info(f"Successfully imported {imported_count} bills for committee {committee_id}")
             
-            # Refresh materialized view after data ingest (PostgreSQL optimization)
-            # Note: This refreshes concurrently, so readers see old data until refresh completes
-            refresh_latest_bills_materialized_view()
-            
             # Invalidate stats cache after data import (next request will recalculate)
-            # This ensures app caches are busted after MV refresh
             _invalidate_stats_cache()
-            logger.debug("Stats cache invalidated after data import and MV refresh")
+            logger.debug("Stats cache invalidated after data import")
             
             return {
                 "status": "success",
@@ -4,12 +4,21 @@ Creates tables for user authentication, saved views, and signing keys
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import configure_mappers
 from datetime import datetime, timezone
+import functools
+import hmac
+import os
 import secrets
 import string
 
 db = SQLAlchemy()
 
+# Password hashing scheme (werkzeug method string) for every hash the app
+# creates; login cost is set by whichever scheme a hash was created with
+PW_HASH_METHOD = os.getenv('PW_HASH_METHOD', 'scrypt:32768:8:1')
+
 
 class User(db.Model):
     """User accounts with role-based access control"""
@@ -115,9 +124,17 @@ class SavedView(db.Model):
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
     
-    # Composite index for user queries
+    # View names are unique per user (the index also serves name lookups;
+    # create_auth_tables adds it to tables created before it existed);
+    # composite indexes for the per-user listing (ORDER BY
+    # updated_at DESC) and case-insensitive prefix search (text_pattern_ops
+    # so LIKE 'abc%' can use the index in any collation)
     __table_args__ = (
-        db.Index('idx_saved_views_user_name', 'user_id', 'name'),
+        db.Index('uq_saved_views_user_name', 'user_id', 'name', unique=True),
+        db.Index('idx_saved_views_user_updated', 'user_id', updated_at.desc()),
+        db.Index('idx_saved_views_user_lower_name', 'user_id',
+                 db.func.lower(name).label('lower_name'),
+                 postgresql_ops={'lower_name': 'text_pattern_ops'}),
     )
     
     def __repr__(self):
@@ -134,6 +151,23 @@ class SavedView(db.Model):
         }
 
 
+# Revoked keys never change again, so their serialized form can be reused
+# across listings (keyed by every field it's built from)
+REVOKED_KEY_DICT_CACHE_SIZE = 50000
+
+
+@functools.lru_cache(maxsize=REVOKED_KEY_DICT_CACHE_SIZE)
+def _revoked_key_dict(id_, key_id, created_at, revoked_at):
+    """Serialized form of a revoked signing key"""
+    return {
+        'id': id_,
+        'key_id': key_id,
+        'created_at': created_at.isoformat(),
+        'revoked_at': revoked_at.isoformat(),
+        'is_revoked': True
+    }
+
+
 class SigningKey(db.Model):
     """Cryptographic keys for data submitters"""
     __tablename__ = 'signing_keys'
@@ -141,16 +175,22 @@ class SigningKey(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     key_id = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    # Kept in plaintext: the secret is the shared HMAC key that ingest request
+    # signatures are checked against (verify_ingest_signature in app.py), so
+    # it can't be replaced by a one-way digest
     secret = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     revoked_at = db.Column(db.DateTime, nullable=True)
     
+    # Revocation flag computed by the database as part of the row
+    is_revoked = db.column_property(revoked_at.isnot(None))
+    
     def __repr__(self):
         return f'<SigningKey {self.key_id} for {self.user.email}>'
     
-    def is_revoked(self):
-        """Check if key is revoked"""
-        return self.revoked_at is not None
+    def check_secret(self, secret):
+        """Check a submitted secret against this key in constant time"""
+        return hmac.compare_digest(self.secret.encode(), secret.encode())
     
     def revoke(self):
         """Revoke the signing key"""
@@ -158,14 +198,18 @@ class SigningKey(db.Model):
     
     def to_dict(self, include_secret=False):
         """Convert signing key to dictionary for JSON serialization"""
+        if self.is_revoked and self.revoked_at is not None:
+            # Copy so callers can add fields without touching the cached dict
+            return dict(_revoked_key_dict(self.id, self.key_id, self.created_at, self.revoked_at))
+        
         data = {
             'id': self.id,
             'key_id': self.key_id,
             'created_at': self.created_at.isoformat(),
             'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
-            'is_revoked': self.is_revoked()
+            'is_revoked': self.is_revoked
         }
-        if include_secret and not self.is_revoked():
+        if include_secret and not self.is_revoked:
             data['secret'] = self.secret
         return data
     
@@ -181,29 +225,69 @@ class SigningKey(db.Model):
         return key_id, secret
 
 
-def init_db(app):
+def init_db(app, create_tables=True):
     """Initialize the database with the Flask app"""
     # Set SQLAlchemy database URI from config
     auth_db_path = app.config.get('AUTH_DATABASE_URL', 'sqlite:///auth.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = auth_db_path
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if auth_db_path.startswith('postgres'):
+        # Sized for one gunicorn worker's threads; pre-ping replaces
+        # connections the server dropped while idle instead of failing a request
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': 5,
+            'max_overflow': 5,
+            'pool_timeout': 30,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        }
     
     db.init_app(app)
+    # Resolve relationships now rather than on the first query, so under
+    # gunicorn's preload_app it happens once in the master, not per worker
+    configure_mappers()
     
+    if create_tables:
+        create_auth_tables(app)
+
+
+def create_auth_tables(app):
+    """Create the auth tables and the default admin user if they don't exist"""
     with app.app_context():
         # Create all tables
         db.create_all()
         
+        # create_all() skips indexes on tables that already exist, and saved
+        # view creation relies on this one to reject duplicate names. On
+        # PostgreSQL a plain CREATE would block writes to saved_views while it
+        # builds, so there it is built CONCURRENTLY by
+        # optimize_postgres.py --create-saved-view-indexes instead
+        if db.engine.dialect.name == 'sqlite':
+            try:
+                db.session.execute(db.text(
+                    'CREATE UNIQUE INDEX IF NOT EXISTS uq_saved_views_user_name '
+                    'ON saved_views (user_id, name)'
+                ))
+                db.session.commit()
+            except IntegrityError as e:
+                db.session.rollback()
+                print(f"⚠️  Duplicate saved view names prevent building uq_saved_views_user_name: {e}")
+                print("   Rename the duplicates and restart; creating saved views fails until then")
+        
         # Create default admin user if it doesn't exist
         admin_email = app.config.get('ADMIN_EMAIL', 'admin@example.com')
         admin_password = app.config.get('ADMIN_PASSWORD', 'change-this-admin-password')
         
-        if not User.query.filter_by(email=admin_email).first():
+        # SELECT EXISTS(...) rather than loading the whole row
+        admin_exists = db.session.query(
+            User.query.filter_by(email=admin_email).exists()
+        ).scalar()
+        if not admin_exists:
             from werkzeug.security import generate_password_hash
             
             admin_user = User(
                 email=admin_email,
-                pw_hash=generate_password_hash(admin_password),
+                pw_hash=generate_password_hash(admin_password, method=PW_HASH_METHOD),
                 role=User.ROLE_ADMIN,
                 is_active=True
             )
@@ -214,4 +298,4 @@ def init_db(app):
         print("Authentication database initialized successfully")
 
 # Export models for easy importing
-__all__ = ['db', 'User', 'EmailToken', 'SavedView', 'SigningKey', 'init_db']
+__all__ = ['db', 'User', 'EmailToken', 'SavedView', 'SigningKey', 'init_db', 'create_auth_tables', 'PW_HASH_METHOD']
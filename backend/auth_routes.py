@@ -3,6 +3,8 @@ Authentication and User Management API Endpoints
 Handles user registration, login, verification, and role management
 """
 
+import functools
+
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import (
     jwt_required, get_jwt_identity, create_access_token,
@@ -12,12 +14,18 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from email_validator import validate_email, EmailNotValidError
 from datetime import datetime, timedelta, timezone
 
-from auth_models import db, User, EmailToken
+from auth_models import db, User, EmailToken, PW_HASH_METHOD
 from email_service import send_verification_email
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
 
+@functools.lru_cache(maxsize=None)
+def pw_hash_prefix():
+    """Method prefix that PW_HASH_METHOD hashes are stored with (defaults filled in)"""
+    return generate_password_hash('', method=PW_HASH_METHOD).split('$', 1)[0]
+
+
 def require_role(required_role):
     """Decorator to require specific role or higher"""
     def decorator(f):
@@ -30,7 +38,7 @@ def require_role(required_role):
             except (ValueError, TypeError):
                 return jsonify({'error': 'Invalid user ID'}), 401
             
-            user = User.query.get(user_id)
+            user = db.session.get(User, user_id)
             
             if not user or not user.is_active:
                 return jsonify({'error': 'User not found or inactive'}), 401
@@ -77,12 +85,14 @@ def register():
             }), 400
         
         # Check if user already exists
-        existing_user = User.query.filter_by(email=email).first()
-        if existing_user:
+        email_taken = db.session.query(
+            User.query.filter_by(email=email).exists()
+        ).scalar()
+        if email_taken:
             return jsonify({'error': 'Email already registered'}), 409
         
         # Create new user (inactive by default)
-        pw_hash = generate_password_hash(password)
+        pw_hash = generate_password_hash(password, method=PW_HASH_METHOD)
         user = User(
             email=email,
             pw_hash=pw_hash,
@@ -195,6 +205,9 @@ def verify_email(token):
         db.session.delete(email_token)
         db.session.commit()
         
+        from keys_routes import invalidate_cached_user
+        invalidate_cached_user(user.id)
+        
         # Return success
         if request.headers.get('Accept') == 'application/json':
             return jsonify({
@@ -261,6 +274,12 @@ def login():
                 'error': 'Account not verified. Please check your email or contact support.'
             }), 401
         
+        # Rehash passwords stored with another scheme (e.g. an old admin
+        # bootstrap) so every later login verifies at the PW_HASH_METHOD cost
+        if user.pw_hash.split('$', 1)[0] != pw_hash_prefix():
+            user.pw_hash = generate_password_hash(password, method=PW_HASH_METHOD)
+            db.session.commit()
+        
         # Create JWT token
         access_token = create_access_token(
             identity=str(user.id),
@@ -291,7 +310,7 @@ def get_current_user():
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid user ID'}), 401
         
-        user = User.query.get(user_id)
+        user = db.session.get(User, user_id)
         
         if not user or not user.is_active:
             return jsonify({'error': 'User not found or inactive'}), 401
@@ -324,7 +343,7 @@ def update_user_role():
             }), 400
         
         # Find target user
-        target_user = User.query.get(user_id)
+        target_user = db.session.get(User, user_id)
         if not target_user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -344,6 +363,10 @@ def update_user_role():
         target_user.role = new_role
         db.session.commit()
         
+        # Make the signing key endpoints pick up the new role immediately
+        from keys_routes import invalidate_cached_user
+        invalidate_cached_user(target_user.id)
+        
         return jsonify({
             'message': f'User role updated from {old_role} to {new_role}',
             'user': target_user.to_dict()
@@ -495,7 +518,7 @@ def reset_password():
         
         # Reset the password
         user = email_token.user
-        user.pw_hash = generate_password_hash(new_password)
+        user.pw_hash = generate_password_hash(new_password, method=PW_HASH_METHOD)
         
         # Remove the reset token
         db.session.delete(email_token)
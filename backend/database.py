@@ -4,12 +4,35 @@ Supports both SQLite (development) and PostgreSQL (production)
 """
 
 import os
+import logging
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 _db_type = None
 _pg_pool = None
+_sqlite_path = None
+
+# SQLite allows one writer at a time, so ingest writes share a single
+# long-lived connection and take turns on it in-process rather than each
+# opening a connection and contending for the database lock
+_sqlite_write_conn = None
+_sqlite_write_lock = threading.Lock()
+
+# Per-connection SQLite settings. journal_mode=WAL is persistent in the
+# database file and set once by init_compliance_database(); under WAL,
+# synchronous=NORMAL only fsyncs at checkpoints rather than on every commit,
+# and readers no longer block (or are blocked by) the ingest writer.
+SQLITE_CONNECTION_PRAGMAS = '''
+    PRAGMA synchronous = NORMAL;
+    PRAGMA temp_store = MEMORY;
+    PRAGMA mmap_size = 268435456;
+    PRAGMA cache_size = -65536;
+    PRAGMA busy_timeout = 5000;
+'''
 
 
 def get_database_type():
@@ -21,6 +44,23 @@ def get_database_type():
     return _db_type
 
 
+def _get_sqlite_path():
+    """SQLite file path from DATABASE_URL, resolved (and its directory created) once"""
+    global _sqlite_path
+    if _sqlite_path is None:
+        db_url = os.getenv('DATABASE_URL', 'sqlite:///compliance_tracker.db')
+        # Extract path from sqlite:///path
+        if db_url.startswith('sqlite:///'):
+            db_path = db_url.replace('sqlite:///', '')
+        else:
+            db_path = db_url
+        
+        # Create parent directory if it doesn't exist
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        _sqlite_path = db_path
+    return _sqlite_path
+
+
 def _get_pg_pool():
     """Lazily initialise a thread-safe PostgreSQL connection pool."""
     global _pg_pool
@@ -33,19 +73,75 @@ def _get_pg_pool():
     return _pg_pool
 
 
+def _open_sqlite_connection(db_path, **kwargs):
+    """Open a SQLite connection with the tuned per-connection PRAGMAs applied"""
+    conn = sqlite3.connect(db_path, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SQLITE_CONNECTION_PRAGMAS)
+    return conn
+
+
+def _get_request_sqlite_connection(db_path):
+    """
+    SQLite connection shared by every get_db_connection() call made while
+    handling one Flask request (stashed on flask.g, closed at app context
+    teardown by close_request_connection). None outside an app context.
+    """
+    from flask import g, has_app_context
+    if not has_app_context():
+        return None
+    conn = g.get('_compliance_db')
+    if conn is None:
+        conn = g._compliance_db = _open_sqlite_connection(db_path)
+    return conn
+
+
+def close_request_connection(exc=None):
+    """teardown_appcontext hook: close the request's shared SQLite connection"""
+    from flask import g
+    conn = g.pop('_compliance_db', None)
+    if conn is not None:
+        conn.close()
+
+
+def close_shared_connections():
+    """Close the PostgreSQL pool and shared SQLite write connection; they reopen lazily"""
+    global _pg_pool, _sqlite_write_conn
+    if _pg_pool is not None:
+        _pg_pool.closeall()
+        _pg_pool = None
+    with _sqlite_write_lock:
+        if _sqlite_write_conn is not None:
+            _sqlite_write_conn.close()
+            _sqlite_write_conn = None
+
+
+def _get_sqlite_write_connection(db_path):
+    """Lazily open the shared SQLite write connection (caller holds the lock)"""
+    global _sqlite_write_conn
+    if _sqlite_write_conn is None:
+        # Used from whichever request thread holds _sqlite_write_lock
+        _sqlite_write_conn = _open_sqlite_connection(db_path, check_same_thread=False)
+    return _sqlite_write_conn
+
+
 @contextmanager
-def get_db_connection():
+def get_db_connection(write=False):
     """
     Context manager for database connections.
     Automatically uses PostgreSQL or SQLite based on DATABASE_URL.
 
+    Pass write=True for ingest transactions. On SQLite these run one at a
+    time on a shared connection inside BEGIN IMMEDIATE, so the write lock is
+    held from the first statement and the batch commits as one transaction.
+    PostgreSQL ignores the flag.
+
     Usage:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM ...")
             results = cursor.fetchall()
     """
-    db_url = os.getenv('DATABASE_URL', 'sqlite:///compliance_tracker.db')
     db_type = get_database_type()
 
     if db_type == 'postgresql':
@@ -61,18 +157,26 @@ def get_db_connection():
             pool.putconn(conn)
     else:
         # SQLite for local development
-        # Extract path from sqlite:///path
-        if db_url.startswith('sqlite:///'):
-            db_path = db_url.replace('sqlite:///', '')
-        else:
-            db_path = db_url
-            
-        # Create parent directory if it doesn't exist
-        db_file = Path(db_path)
-        db_file.parent.mkdir(parents=True, exist_ok=True)
+        db_path = _get_sqlite_path()
         
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
+        if write:
+            with _sqlite_write_lock:
+                conn = _get_sqlite_write_connection(db_path)
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    yield conn
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                # Re-analyze any tables whose statistics the ingest made stale
+                # (PostgreSQL's autovacuum does this on its own)
+                conn.execute('PRAGMA optimize')
+            return
+        
+        # Within a request, reuse its connection (and warm page cache)
+        shared_conn = _get_request_sqlite_connection(db_path)
+        conn = shared_conn or _open_sqlite_connection(db_path)
         
         try:
             yield conn
@@ -81,7 +185,8 @@ def get_db_connection():
             conn.rollback()
             raise
         finally:
-            conn.close()
+            if shared_conn is None:
+                conn.close()
 
 
 def init_compliance_database():
@@ -127,6 +232,11 @@ def init_compliance_database():
                 )
             ''')
 
+            # Indexes added to an existing bill_compliance are built
+            # CONCURRENTLY by optimize_postgres.py --create-index instead
+            cursor.execute("SELECT to_regclass('bill_compliance') IS NULL")
+            new_compliance_table = cursor.fetchone()[0]
+
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS bill_compliance (
                     id SERIAL PRIMARY KEY,
@@ -169,14 +279,9 @@ def init_compliance_database():
                 ''')
             
             # Create indexes for better query performance
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_bill_compliance_committee 
-                ON bill_compliance(committee_id)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_bill_compliance_bill 
-                ON bill_compliance(bill_id)
-            ''')
+            # committee_id and bill_id lookups use the leading column of the
+            # composite indexes below; optimize_postgres.py --create-index drops
+            # the single-column indexes they replaced from existing databases
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_bill_compliance_date 
                 ON bill_compliance(generated_at DESC)
@@ -189,6 +294,21 @@ def init_compliance_database():
                 ON bill_compliance(bill_id, committee_id, generated_at DESC)
             ''')
             
+            if new_compliance_table:
+                # Committee-first variant for per-committee "latest row per bill"
+                # lookups (compare_committee_dates.py reads one committee at a time)
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_bill_compliance_committee_bill_date 
+                    ON bill_compliance(committee_id, bill_id, generated_at DESC)
+                ''')
+                
+                # Latest scan at or before a date for one committee: MAX(generated_at)
+                # becomes a single backward index probe
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_bill_compliance_committee_date 
+                    ON bill_compliance(committee_id, generated_at DESC)
+                ''')
+            
             # Index for state filtering (PostgreSQL)
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_bill_compliance_state 
@@ -261,7 +381,54 @@ def init_compliance_database():
                 )
             ''')
             
+            # Latest compliance row per (bill_id, committee_id), maintained
+            # by optimize_postgres.py --refresh-latest (not on the ingest path)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS latest_bill_compliance (
+                    id INTEGER NOT NULL,
+                    committee_id TEXT NOT NULL,
+                    bill_id TEXT NOT NULL,
+                    hearing_date TEXT,
+                    deadline_60 TEXT,
+                    effective_deadline TEXT,
+                    extension_order_url TEXT,
+                    extension_date TEXT,
+                    reported_out INTEGER NOT NULL,
+                    reported_out_date TEXT,
+                    summary_present INTEGER NOT NULL,
+                    summary_url TEXT,
+                    votes_present INTEGER NOT NULL,
+                    votes_url TEXT,
+                    state TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    notice_status TEXT,
+                    notice_gap_days INTEGER,
+                    announcement_date TEXT,
+                    scheduled_hearing_date TEXT,
+                    generated_at TIMESTAMP,
+                    PRIMARY KEY (bill_id, committee_id)
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_latest_bill_compliance_committee 
+                ON latest_bill_compliance(committee_id)
+            ''')
+            
+            # Ingest bookkeeping (watermark for the incremental merge above)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS ingest_state (
+                    id INTEGER PRIMARY KEY DEFAULT 1,
+                    latest_bills_watermark TIMESTAMP,
+                    CONSTRAINT single_row CHECK (id = 1)
+                )
+            ''')
+            
         else:
+            # Write-ahead logging persists in the database file, so setting it
+            # here covers every later connection
+            cursor.execute('PRAGMA journal_mode = WAL')
+            
             # SQLite schema (original)
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS committees (
@@ -287,13 +454,17 @@ def init_compliance_database():
                 )
             ''')
 
+            # Text primary key and short rows: WITHOUT ROWID stores the table
+            # as a single B-tree keyed on bill_id, instead of a rowid table plus
+            # a separate primary key index that every upsert has to maintain.
+            # Applies to newly created databases.
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS bills (
                     bill_id TEXT PRIMARY KEY,
                     bill_title TEXT,
                     bill_url TEXT,
                     updated_at TEXT
-                )
+                ) WITHOUT ROWID
             ''')
 
             cursor.execute('''
@@ -337,14 +508,6 @@ def init_compliance_database():
                 ''')
             
             # Create indexes for better query performance (SQLite)
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_bill_compliance_committee 
-                ON bill_compliance(committee_id)
-            ''')
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_bill_compliance_bill 
-                ON bill_compliance(bill_id)
-            ''')
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_bill_compliance_date 
                 ON bill_compliance(generated_at DESC)
@@ -357,6 +520,26 @@ def init_compliance_database():
                 ON bill_compliance(bill_id, committee_id, generated_at DESC)
             ''')
             
+            # Committee-first variant for per-committee "latest row per bill"
+            # lookups (compare_committee_dates.py reads one committee at a time)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_bill_compliance_committee_bill_date 
+                ON bill_compliance(committee_id, bill_id, generated_at DESC)
+            ''')
+            
+            # Latest scan at or before a date for one committee: MAX(generated_at)
+            # becomes a single backward index probe
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_bill_compliance_committee_date 
+                ON bill_compliance(committee_id, generated_at DESC)
+            ''')
+            
+            # committee_id and bill_id lookups use the leading column of the
+            # composite indexes above; the single-column indexes they replaced
+            # only added write cost, so drop them from existing databases
+            cursor.execute('DROP INDEX IF EXISTS idx_bill_compliance_committee')
+            cursor.execute('DROP INDEX IF EXISTS idx_bill_compliance_bill')
+            
             # Index for state filtering (SQLite)
             cursor.execute('''
                 CREATE INDEX IF NOT EXISTS idx_bill_compliance_state 
@@ -428,56 +611,93 @@ def init_compliance_database():
                     CONSTRAINT single_row CHECK (id = 1)
                 )
             ''')
+            
+            # Give the planner index statistics (sqlite_stat1); analysis_limit
+            # samples each index so this stays quick on a large database
+            cursor.execute('PRAGMA analysis_limit = 400')
+            cursor.execute('ANALYZE')
         
         print(f"✅ Compliance database schema initialized ({db_type})")
 
 
-def refresh_latest_bills_materialized_view():
+# Columns copied from bill_compliance into latest_bill_compliance
+LATEST_BILL_COLUMNS = (
+    'id', 'committee_id', 'bill_id', 'hearing_date', 'deadline_60',
+    'effective_deadline', 'extension_order_url', 'extension_date',
+    'reported_out', 'reported_out_date', 'summary_present', 'summary_url',
+    'votes_present', 'votes_url', 'state', 'reason', 'notice_status',
+    'notice_gap_days', 'announcement_date', 'scheduled_hearing_date',
+    'generated_at',
+)
+
+# Rows newer than (watermark - overlap) are re-merged, so rows from an ingest
+# that committed after a later one already advanced the watermark aren't lost.
+# generated_at is stamped when a row is written, not when its transaction
+# commits: a write transaction that commits more than this long after stamping
+# its rows, and after a merge has run, is skipped until the next rebuild
+# (optimize_postgres.py --rebuild-latest)
+LATEST_BILLS_WATERMARK_OVERLAP = '10 minutes'
+
+# One statement, so the watermark is the newest row this merge actually read
+# (not a separate MAX() that could see rows committed in between); an empty
+# merge leaves the watermark alone
+_column_list = ', '.join(LATEST_BILL_COLUMNS)
+MERGE_LATEST_BILL_COMPLIANCE_SQL = f'''
+    WITH candidates AS (
+        SELECT DISTINCT ON (bill_id, committee_id) {_column_list}
+        FROM bill_compliance
+        WHERE generated_at > COALESCE(
+            (SELECT latest_bills_watermark - INTERVAL '{LATEST_BILLS_WATERMARK_OVERLAP}'
+             FROM ingest_state WHERE id = 1),
+            '-infinity'
+        )
+        ORDER BY bill_id, committee_id, generated_at DESC NULLS LAST, id DESC
+    ), merged AS (
+        INSERT INTO latest_bill_compliance ({_column_list})
+        SELECT {_column_list} FROM candidates
+        ON CONFLICT (bill_id, committee_id) DO UPDATE SET
+            {', '.join(f'{col} = EXCLUDED.{col}' for col in LATEST_BILL_COLUMNS if col not in ('bill_id', 'committee_id'))}
+        WHERE EXCLUDED.generated_at >= latest_bill_compliance.generated_at
+    )
+    INSERT INTO ingest_state (id, latest_bills_watermark)
+    SELECT 1, MAX(generated_at) FROM candidates
+    HAVING MAX(generated_at) IS NOT NULL
+    ON CONFLICT (id) DO UPDATE SET
+        latest_bills_watermark = GREATEST(ingest_state.latest_bills_watermark,
+                                          EXCLUDED.latest_bills_watermark)
+'''
+del _column_list
+
+
+def refresh_latest_bill_compliance(rebuild=False):
     """
-    Refresh the latest_bills_mv materialized view.
-    Should be called after data ingest operations to keep the view up to date.
+    Merge bill_compliance rows added since the last run into
+    latest_bill_compliance. Only rows past the stored watermark are scanned.
+    rebuild=True empties the table and watermark first and merges every row.
     
     Returns:
         bool: True if successful, False otherwise
     """
-    db_type = get_database_type()
-    if db_type != 'postgresql':
-        # Materialized views are PostgreSQL-only, skip for SQLite
+    if get_database_type() != 'postgresql':
+        # SQLite queries compute the latest rows directly
         return True
     
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Check if view exists
-            cursor.execute('''
-                SELECT EXISTS (
-                    SELECT 1 FROM pg_matviews 
-                    WHERE matviewname = 'latest_bills_mv'
-                )
-            ''')
-            exists = cursor.fetchone()[0]
-            
-            if not exists:
-                # View doesn't exist yet, that's okay
-                return True
-            
-            # Try concurrent refresh first (requires unique index)
-            try:
-                cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY latest_bills_mv')
-                # Note: During concurrent refresh, readers see the OLD view until refresh completes
-                # Application caches should be invalidated after refresh
-            except Exception as e:
-                # If concurrent fails (e.g., no unique index), use regular refresh
-                # Regular refresh will briefly lock the view
-                cursor.execute('REFRESH MATERIALIZED VIEW latest_bills_mv')
-            
+            # Serialize concurrent merges (released at commit)
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('latest_bill_compliance'))")
+            if rebuild:
+                cursor.execute('TRUNCATE latest_bill_compliance')
+                cursor.execute('UPDATE ingest_state SET latest_bills_watermark = NULL WHERE id = 1')
+            cursor.execute(MERGE_LATEST_BILL_COMPLIANCE_SQL)
             return True
-    except Exception:
-        # Don't fail the main operation if view refresh fails
+    except Exception as e:
+        logger.error(f"Merge into latest_bill_compliance failed: {str(e)}", exc_info=True)
         return False
 
 
 # Export public functions
-__all__ = ['get_db_connection', 'get_database_type', 'init_compliance_database', 'refresh_latest_bills_materialized_view']
+__all__ = ['get_db_connection', 'get_database_type', 'close_request_connection', 'close_shared_connections', 'init_compliance_database', 'refresh_latest_bill_compliance']
 
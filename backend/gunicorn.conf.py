@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for the Beacon Hill Compliance Tracker backend
+Loaded automatically by `cd backend && gunicorn app:app` (render.yaml)
+and passed explicitly by start_prod.py
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+keepalive = 5
+graceful_timeout = 30
+
+# Worker heartbeat files on tmpfs, so a slow disk can't stall the arbiter's
+# liveness checks
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Import app.py (and run create_app's database setup) once in the master;
+# workers fork from it and share its loaded modules copy-on-write
+preload_app = True
+
+
+def pre_fork(server, worker):
+    """Close the master's database connections so no worker inherits their sockets"""
+    from app import app
+    from auth_models import db
+    from database import close_shared_connections
+
+    close_shared_connections()
+    with app.app_context():
+        db.engine.dispose()
@@ -12,9 +12,6 @@ from pathlib import Path
 backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
-from flask import Flask
-from auth_models import db, User
-from database import get_db_connection, get_database_type
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -23,6 +20,9 @@ load_dotenv()
 
 def create_temp_app():
     """Create a temporary Flask app for health checks"""
+    from flask import Flask
+    from auth_models import db
+
     app = Flask(__name__)
     
     # Database configuration
@@ -35,52 +35,53 @@ def create_temp_app():
     return app
 
 
+# Environment variables reported by check_environment
+REQUIRED_ENV_VARS = (
+    'DATABASE_URL',
+    'AUTH_DATABASE_URL',
+    'SECRET_KEY',
+    'JWT_SECRET_KEY',
+    'FRONTEND_URL',
+)
+
+OPTIONAL_ENV_VARS = (
+    'CORS_ORIGINS',
+    'ADMIN_EMAIL',
+    'ADMIN_PASSWORD',
+    'MAIL_SERVER',
+    'MAIL_USERNAME',
+)
+
+
+def _display_value(value):
+    """Show first 50 chars only"""
+    return value[:50] + '...' if len(value) > 50 else value
+
+
 def check_environment():
     """Check environment variables"""
-    print("\n🔍 Environment Variables Check")
-    print("=" * 60)
-    
-    required_vars = [
-        'DATABASE_URL',
-        'AUTH_DATABASE_URL',
-        'SECRET_KEY',
-        'JWT_SECRET_KEY',
-        'FRONTEND_URL',
-    ]
-    
-    optional_vars = [
-        'CORS_ORIGINS',
-        'ADMIN_EMAIL',
-        'ADMIN_PASSWORD',
-        'MAIL_SERVER',
-        'MAIL_USERNAME',
-    ]
-    
-    all_good = True
+    env = os.environ
+    lines = ["\n🔍 Environment Variables Check", "=" * 60]
     
     # Check required variables
-    for var in required_vars:
-        value = os.getenv(var)
-        if value:
-            # Show first 50 chars only
-            display_value = value[:50] + '...' if len(value) > 50 else value
-            print(f"✅ {var}: {display_value}")
-        else:
-            print(f"❌ {var}: NOT SET (REQUIRED)")
-            all_good = False
-    
-    print()
+    missing = [var for var in REQUIRED_ENV_VARS if not env.get(var)]
+    lines.extend(
+        f"✅ {var}: {_display_value(env[var])}" if env.get(var)
+        else f"❌ {var}: NOT SET (REQUIRED)"
+        for var in REQUIRED_ENV_VARS
+    )
+    
+    lines.append("")
     
     # Check optional variables
-    for var in optional_vars:
-        value = os.getenv(var)
-        if value:
-            display_value = value[:50] + '...' if len(value) > 50 else value
-            print(f"ℹ️  {var}: {display_value}")
-        else:
-            print(f"⚠️  {var}: Not set (optional)")
+    lines.extend(
+        f"ℹ️  {var}: {_display_value(env[var])}" if env.get(var)
+        else f"⚠️  {var}: Not set (optional)"
+        for var in OPTIONAL_ENV_VARS
+    )
     
-    return all_good
+    print("\n".join(lines))
+    return not missing
 
 
 def check_auth_database():
@@ -88,6 +89,8 @@ def check_auth_database():
     print("\n🗄️  Auth Database Check")
     print("=" * 60)
     
+    from auth_models import User
+
     app = create_temp_app()
     
     with app.app_context():
@@ -133,35 +136,25 @@ def check_compliance_database():
     print("=" * 60)
     
     try:
+        from database import get_db_connection, get_database_type
+
         db_type = get_database_type()
         print(f"✅ Database type: {db_type}")
         
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Check committees
-            cursor.execute("SELECT COUNT(*) FROM committees")
-            if db_type == 'postgresql':
-                count = cursor.fetchone()[0]
-            else:
-                count = cursor.fetchone()[0]
-            print(f"   Committees: {count}")
-            
-            # Check bills
-            cursor.execute("SELECT COUNT(*) FROM bills")
-            if db_type == 'postgresql':
-                count = cursor.fetchone()[0]
-            else:
-                count = cursor.fetchone()[0]
-            print(f"   Bills: {count}")
-            
-            # Check compliance records
-            cursor.execute("SELECT COUNT(*) FROM bill_compliance")
-            if db_type == 'postgresql':
-                count = cursor.fetchone()[0]
-            else:
-                count = cursor.fetchone()[0]
-            print(f"   Compliance records: {count}")
+            # Count committees, bills and compliance records in one query
+            cursor.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM committees),
+                    (SELECT COUNT(*) FROM bills),
+                    (SELECT COUNT(*) FROM bill_compliance)
+            """)
+            committees, bills, records = cursor.fetchone()
+            print(f"   Committees: {committees}")
+            print(f"   Bills: {bills}")
+            print(f"   Compliance records: {records}")
         
         print("✅ Compliance database connected successfully")
         return True
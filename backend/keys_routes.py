@@ -3,25 +3,159 @@ Signing Key Management API Endpoints
 Handles generation, listing, and revocation of signing keys for data submitters
 """
 
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from flask import Blueprint, Response, g, request, jsonify, current_app, stream_with_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, raiseload, selectinload
 
 from auth_models import db, User, SigningKey
-from email_service import send_key_generated_email
+from email_service import send_email_async, send_key_generated_email
 
 keys_bp = Blueprint('keys', __name__, url_prefix='/api/keys')
 
+# Fresh key_ids to try if a generated one collides with an existing key
+KEY_GENERATION_ATTEMPTS = 3
+
+# Rows fetched per round trip when streaming key listings
+KEY_LIST_BATCH_SIZE = 500
+
+# Columns used by SigningKey.to_dict(include_secret=False)
+KEY_LIST_COLUMNS = (
+    SigningKey.id, SigningKey.key_id, SigningKey.created_at,
+    SigningKey.revoked_at, SigningKey.is_revoked, SigningKey.user_id
+)
+
+# Short-lived in-process cache of active users' snapshots, so every
+# privileged request doesn't need a round trip to the auth database. Each
+# gunicorn worker has its own copy; admin checks and refusals always read the
+# database, so the only staleness is a demoted or deactivated privileged user
+# keeping key access for up to the TTL on workers that didn't handle the change
+USER_CACHE_TTL_SECONDS = 15
+USER_CACHE_MAX_SIZE = 5000
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+# Short-lived cache of failed /verify outcomes keyed by a digest of key_id
+# and secret (raw secrets are never stored), so repeated bad submissions don't
+# each hash against the database. A failure can't turn into a success
+# (secrets never change, revocation is permanent, and unknown key_ids are
+# random strings nobody is issued), so no worker needs invalidating; successes
+# are always checked, so a revoke applies at once on every worker.
+VERIFY_CACHE_TTL_SECONDS = 10
+VERIFY_CACHE_MAX_SIZE = 20000
+_verify_cache = {}
+_verify_cache_lock = threading.Lock()
+
+
+
+class CachedUser(namedtuple('CachedUser', 'id email role is_active')):
+    """Read-only snapshot of the User fields the key endpoints use"""
+    __slots__ = ()
+
+    def can_manage_users(self):
+        """Check if user can manage other users"""
+        return self.role == User.ROLE_ADMIN
+
+    def can_generate_keys(self):
+        """Check if user can generate signing keys"""
+        return self.role in [User.ROLE_PRIVILEGED, User.ROLE_ADMIN]
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user's cached snapshot after their role or status changes"""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+
+def _fetch_user_snapshot(user_id, fresh=False):
+    """Get a user snapshot from the cache, loading it on a miss (or always if fresh)"""
+    now = time.monotonic()
+    if not fresh:
+        with _user_cache_lock:
+            entry = _user_cache.get(user_id)
+        if entry and entry[0] > now:
+            return entry[1]
+    
+    user = db.session.get(
+        User, user_id,
+        options=[load_only(User.id, User.email, User.role, User.is_active)]
+    )
+    snapshot = (
+        CachedUser(user.id, user.email, user.role, user.is_active)
+        if user else None
+    )
+    
+    with _user_cache_lock:
+        if not (snapshot and snapshot.is_active):
+            # Missing and inactive users aren't cached, so activation (e.g.
+            # activate_user.py in another process) takes effect at once
+            _user_cache.pop(user_id, None)
+            return snapshot
+        if len(_user_cache) >= USER_CACHE_MAX_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            _user_cache.pop(next(iter(_user_cache)), None)
+        _user_cache[user_id] = (now + USER_CACHE_TTL_SECONDS, snapshot)
+    return snapshot
+
 
-def get_current_user():
-    """Helper function to get current authenticated user"""
+def _verify_cache_key(key_id, secret):
+    """Digest identifying a (key_id, secret) pair in the verify cache"""
+    return hashlib.sha256(f'{key_id}:{secret}'.encode()).digest()
+
+
+def _get_cached_verification(cache_key):
+    """Get a cached verification result, or None if missing or expired"""
+    with _verify_cache_lock:
+        entry = _verify_cache.get(cache_key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _cache_verification(cache_key, result):
+    """Store a failed verification result for VERIFY_CACHE_TTL_SECONDS"""
+    if result['valid']:
+        return
+    expires_at = time.monotonic() + VERIFY_CACHE_TTL_SECONDS
+    with _verify_cache_lock:
+        if (cache_key not in _verify_cache
+                and len(_verify_cache) >= VERIFY_CACHE_MAX_SIZE):
+            # Evict the oldest entry (dicts keep insertion order)
+            _verify_cache.pop(next(iter(_verify_cache)), None)
+        _verify_cache[cache_key] = (expires_at, result)
+
+
+def keys_etag(*parts):
+    """Weak ETag value for a keys response, built from what its content depends on"""
+    return hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def not_modified_response(etag):
+    """Return a 304 response if the client already has this ETag, else None"""
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+
+def get_current_user(fresh=False):
+    """Helper function to get current authenticated user (fresh=True skips the cache)"""
     current_user_id = get_jwt_identity()
-    # Convert string ID back to integer
+    # Convert string ID back to integer (JWT "sub" claims must be strings,
+    # so the identity can't be issued as an int)
     try:
         user_id = int(current_user_id)
     except (ValueError, TypeError):
         return None
     
-    user = User.query.get(user_id)
+    user = _fetch_user_snapshot(user_id, fresh=fresh)
     
     if not user or not user.is_active:
         return None
@@ -29,54 +163,79 @@ def get_current_user():
     return user
 
 
-def require_key_permissions():
-    """Helper function to check if user can manage signing keys"""
-    user = get_current_user()
+# Endpoints that skip the JWT check (authenticated by the key itself)
+PUBLIC_ENDPOINTS = {'keys.verify_signing_key'}
+
+# Endpoints that require the admin role rather than privileged+
+ADMIN_ENDPOINTS = {'keys.admin_list_all_keys', 'keys.admin_revoke_signing_key'}
+
+
+@keys_bp.before_request
+def load_key_user():
+    """Authenticate and role-check every keys endpoint once, leaving the user on g.user"""
+    if request.endpoint in PUBLIC_ENDPOINTS or request.method == 'OPTIONS':
+        return None
+    
+    verify_jwt_in_request()
+    # Admin endpoints always check the role against the database
+    admin_only = request.endpoint in ADMIN_ENDPOINTS
+    user = get_current_user(fresh=admin_only)
+    if user and not admin_only and not user.can_generate_keys():
+        # Re-read before refusing, so a just-promoted user isn't turned away
+        # by a cached snapshot
+        user = get_current_user(fresh=True)
     if not user:
-        return None, jsonify({'error': 'User not found or inactive'}), 401
+        return jsonify({'error': 'User not found or inactive'}), 401
     
-    if not user.can_generate_keys():
-        return None, jsonify({
+    if admin_only:
+        if not user.can_manage_users():
+            return jsonify({'error': 'Admin permissions required'}), 403
+    elif not user.can_generate_keys():
+        return jsonify({
             'error': 'Insufficient permissions. Privileged role required.'
         }), 403
     
-    return user, None, None
+    g.user = user
+    return None
 
 
 @keys_bp.route('', methods=['POST'])
-@jwt_required()
 def generate_signing_key():
     """Generate a new signing key pair for the current user (privileged+ only)"""
     try:
-        user, error_response, status_code = require_key_permissions()
-        if error_response:
-            return error_response, status_code
+        user = g.user
         
         data = request.get_json() or {}
         
         # Optional description/note for the key
         description = data.get('description', '').strip()
         
-        # Generate key pair
-        key_id, secret = SigningKey.generate_key_pair()
-        
-        # Create signing key record
-        signing_key = SigningKey(
-            user_id=user.id,
-            key_id=key_id,
-            secret=secret
-        )
+        # Generate and insert the key pair, flushing so a key_id collision
+        # is retried here rather than failing the whole request
+        for _ in range(KEY_GENERATION_ATTEMPTS):
+            key_id, secret = SigningKey.generate_key_pair()
+            signing_key = SigningKey(
+                user_id=user.id,
+                key_id=key_id,
+                secret=secret
+            )
+            db.session.add(signing_key)
+            try:
+                db.session.flush()
+                break
+            except IntegrityError:
+                db.session.rollback()
+        else:
+            raise RuntimeError('Could not generate a unique key_id')
         
-        db.session.add(signing_key)
         db.session.commit()
         
-        # Send notification email (non-blocking)
+        # Send notification email in the background; failures are logged by
+        # send_key_generated_email and don't affect the response
         try:
-            send_key_generated_email(user.email, key_id)
+            send_email_async(send_key_generated_email, user.email, key_id)
         except Exception as e:
-            current_app.logger.error(f'Failed to send key generation email: {e}')
-            # Don't fail the operation if email fails
-            pass
+            current_app.logger.error(f'Failed to queue key generation email: {e}')
         
         # Return the key with secret (only time it's shown)
         response_data = signing_key.to_dict(include_secret=True)
@@ -96,13 +255,10 @@ def generate_signing_key():
 
 
 @keys_bp.route('', methods=['GET'])
-@jwt_required()
 def list_signing_keys():
     """List all signing keys for the current user (privileged+ only)"""
     try:
-        user, error_response, status_code = require_key_permissions()
-        if error_response:
-            return error_response, status_code
+        user = g.user
         
         # Get query parameters
         include_revoked = request.args.get('include_revoked', 'false').lower() == 'true'
@@ -113,13 +269,31 @@ def list_signing_keys():
         if not include_revoked:
             query = query.filter(SigningKey.revoked_at.is_(None))
         
-        signing_keys = query.order_by(SigningKey.created_at.desc()).all()
-        
-        return jsonify({
+        # Count plus newest timestamps: enough to tell whether the listing
+        # changed (keys are only ever created or revoked)
+        count, last_created, last_revoked = query.with_entities(
+            func.count(SigningKey.id),
+            func.max(SigningKey.created_at),
+            func.max(SigningKey.revoked_at)
+        ).one()
+        
+        etag = keys_etag(user.id, include_revoked, count, last_created, last_revoked)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+        
+        # Stream only the listed columns, with no lazy relationship loads
+        signing_keys = query.options(
+            load_only(*KEY_LIST_COLUMNS), raiseload('*')
+        ).order_by(SigningKey.created_at.desc()).yield_per(KEY_LIST_BATCH_SIZE)
+        
+        response = jsonify({
             'keys': [key.to_dict(include_secret=False) for key in signing_keys],
-            'count': len(signing_keys),
+            'count': count,
             'include_revoked': include_revoked
-        }), 200
+        })
+        response.set_etag(etag, weak=True)
+        return response, 200
         
     except Exception as e:
         current_app.logger.error(f'List signing keys error: {e}')
@@ -127,13 +301,10 @@ def list_signing_keys():
 
 
 @keys_bp.route('/<int:key_id>', methods=['GET'])
-@jwt_required()
 def get_signing_key(key_id):
     """Get details of a specific signing key (privileged+ only, user-scoped)"""
     try:
-        user, error_response, status_code = require_key_permissions()
-        if error_response:
-            return error_response, status_code
+        user = g.user
         
         # Find the key (must belong to current user)
         signing_key = SigningKey.query.filter_by(
@@ -144,9 +315,16 @@ def get_signing_key(key_id):
         if not signing_key:
             return jsonify({'error': 'Signing key not found'}), 404
         
-        return jsonify({
+        etag = keys_etag(signing_key.id, signing_key.revoked_at)
+        not_modified = not_modified_response(etag)
+        if not_modified:
+            return not_modified
+        
+        response = jsonify({
             'key': signing_key.to_dict(include_secret=False)
-        }), 200
+        })
+        response.set_etag(etag, weak=True)
+        return response, 200
         
     except Exception as e:
         current_app.logger.error(f'Get signing key error: {e}')
@@ -155,13 +333,10 @@ def get_signing_key(key_id):
 
 @keys_bp.route('/revoke/<int:key_id>', methods=['PATCH'])
 @keys_bp.route('/<int:key_id>/revoke', methods=['PATCH'])
-@jwt_required()
 def revoke_signing_key(key_id):
     """Revoke a signing key (privileged+ only, user-scoped)"""
     try:
-        user, error_response, status_code = require_key_permissions()
-        if error_response:
-            return error_response, status_code
+        user = g.user
         
         # Find the key (must belong to current user)
         signing_key = SigningKey.query.filter_by(
@@ -172,7 +347,7 @@ def revoke_signing_key(key_id):
         if not signing_key:
             return jsonify({'error': 'Signing key not found'}), 404
         
-        if signing_key.is_revoked():
+        if signing_key.is_revoked:
             return jsonify({'error': 'Signing key is already revoked'}), 400
         
         # Revoke the key
@@ -190,6 +365,40 @@ def revoke_signing_key(key_id):
         return jsonify({'error': 'Failed to revoke signing key'}), 500
 
 
+def check_signing_key(key_id, secret):
+    """Look up a signing key and build the /verify result for a secret"""
+    # Find the key by key_id
+    signing_key = SigningKey.query.filter_by(key_id=key_id).first()
+    
+    if not signing_key:
+        return {
+            'valid': False,
+            'reason': 'Key not found'
+        }
+    
+    if signing_key.is_revoked:
+        return {
+            'valid': False,
+            'reason': 'Key has been revoked',
+            'revoked_at': signing_key.revoked_at.isoformat()
+        }
+    
+    if not signing_key.check_secret(secret):
+        return {
+            'valid': False,
+            'reason': 'Invalid secret'
+        }
+    
+    # Key is valid
+    return {
+        'valid': True,
+        'key_id': signing_key.key_id,
+        'user_email': signing_key.user.email,
+        'created_at': signing_key.created_at.isoformat(),
+        'user_role': signing_key.user.role
+    }
+
+
 @keys_bp.route('/verify', methods=['POST'])
 def verify_signing_key():
     """Verify a signing key (public endpoint for external validation)"""
@@ -204,36 +413,13 @@ def verify_signing_key():
         if not key_id or not secret:
             return jsonify({'error': 'key_id and secret are required'}), 400
         
-        # Find the key by key_id
-        signing_key = SigningKey.query.filter_by(key_id=key_id).first()
+        cache_key = _verify_cache_key(key_id, secret)
+        result = _get_cached_verification(cache_key)
+        if result is None:
+            result = check_signing_key(key_id, secret)
+            _cache_verification(cache_key, result)
         
-        if not signing_key:
-            return jsonify({
-                'valid': False,
-                'reason': 'Key not found'
-            }), 200
-        
-        if signing_key.is_revoked():
-            return jsonify({
-                'valid': False,
-                'reason': 'Key has been revoked',
-                'revoked_at': signing_key.revoked_at.isoformat()
-            }), 200
-        
-        if signing_key.secret != secret:
-            return jsonify({
-                'valid': False,
-                'reason': 'Invalid secret'
-            }), 200
-        
-        # Key is valid
-        return jsonify({
-            'valid': True,
-            'key_id': signing_key.key_id,
-            'user_email': signing_key.user.email,
-            'created_at': signing_key.created_at.isoformat(),
-            'user_role': signing_key.user.role
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         current_app.logger.error(f'Verify signing key error: {e}')
@@ -242,23 +428,15 @@ def verify_signing_key():
 
 # Admin-only endpoints
 @keys_bp.route('/admin/all', methods=['GET'])
-@jwt_required()
 def admin_list_all_keys():
     """Admin-only: List all signing keys across all users"""
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        if not user.can_manage_users():
-            return jsonify({'error': 'Admin permissions required'}), 403
-        
         # Get query parameters
         include_revoked = request.args.get('include_revoked', 'false').lower() == 'true'
         user_id = request.args.get('user_id')
         
         # Build query
-        query = SigningKey.query.join(User)
+        query = SigningKey.query
         
         if user_id:
             try:
@@ -270,22 +448,41 @@ def admin_list_all_keys():
         if not include_revoked:
             query = query.filter(SigningKey.revoked_at.is_(None))
         
-        signing_keys = query.order_by(SigningKey.created_at.desc()).all()
-        
-        # Include user email in response for admin
-        keys_data = []
-        for key in signing_keys:
-            key_data = key.to_dict(include_secret=False)
-            key_data['user_email'] = key.user.email
-            key_data['user_role'] = key.user.role
-            keys_data.append(key_data)
-        
-        return jsonify({
-            'keys': keys_data,
-            'count': len(keys_data),
-            'include_revoked': include_revoked,
-            'filtered_by_user': user_id is not None
-        }), 200
+        # Stream keys, loading owners in one batched query per chunk instead
+        # of one lazy load per key
+        signing_keys = query.options(
+            load_only(*KEY_LIST_COLUMNS),
+            selectinload(SigningKey.user).load_only(User.email, User.role)
+        ).order_by(SigningKey.created_at.desc()).yield_per(KEY_LIST_BATCH_SIZE)
+        
+        filtered_by_user = user_id is not None
+        
+        # Write the JSON array as rows arrive so neither the key list nor the
+        # serialized body is held in memory in full. count is taken from the
+        # streamed rows, so it always matches the list
+        def generate():
+            dumps = current_app.json.dumps
+            yield '{"keys":['
+            count = 0
+            try:
+                for key in signing_keys:
+                    # Include user email in response for admin
+                    key_data = key.to_dict(include_secret=False)
+                    key_data['user_email'] = key.user.email
+                    key_data['user_role'] = key.user.role
+                    yield (',' if count else '') + dumps(key_data)
+                    count += 1
+            except Exception as e:
+                # Headers are already sent; the truncated body fails to parse
+                current_app.logger.error(f'Admin list all keys stream error: {e}')
+                raise
+            yield '],' + dumps({
+                'count': count,
+                'include_revoked': include_revoked,
+                'filtered_by_user': filtered_by_user
+            })[1:]
+        
+        return Response(stream_with_context(generate()), status=200, mimetype='application/json')
         
     except Exception as e:
         current_app.logger.error(f'Admin list all keys error: {e}')
@@ -293,24 +490,16 @@ def admin_list_all_keys():
 
 
 @keys_bp.route('/admin/revoke/<int:key_id>', methods=['PATCH'])
-@jwt_required()
 def admin_revoke_signing_key(key_id):
     """Admin-only: Revoke any user's signing key"""
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        if not user.can_manage_users():
-            return jsonify({'error': 'Admin permissions required'}), 403
-        
         # Find the key (any user)
-        signing_key = SigningKey.query.get(key_id)
+        signing_key = db.session.get(SigningKey, key_id)
         
         if not signing_key:
             return jsonify({'error': 'Signing key not found'}), 404
         
-        if signing_key.is_revoked():
+        if signing_key.is_revoked:
             return jsonify({'error': 'Signing key is already revoked'}), 400
         
         # Revoke the key
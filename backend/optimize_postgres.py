@@ -3,18 +3,21 @@
 PostgreSQL Performance Optimization Script for Beacon Hill Tracker
 
 This script implements performance optimizations for heavy ROW_NUMBER() and DELETE queries:
-1. Creates optimized index for window partition pattern
-2. Creates materialized view for latest bills
+1. Creates optimized indexes for window partition pattern and per-committee lookups
+2. Maintains latest_bill_compliance (latest row per bill) and drops the old latest_bills_mv
 3. Provides optimized cleanup query
 4. Adds maintenance utilities
+5. Creates a partial index for active signing key listings (auth database)
+6. Creates saved view listing/search indexes (auth database)
 
 Usage:
-    python backend/optimize_postgres.py [--create-index] [--create-view] [--refresh-view] [--vacuum]
+    python backend/optimize_postgres.py [--create-index] [--refresh-latest] [--rebuild-latest] [--drop-view] [--vacuum] [--create-key-indexes] [--create-saved-view-indexes] [--verbose]
 """
 
 import os
 import sys
 import argparse
+from contextlib import contextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -22,13 +25,64 @@ from dotenv import load_dotenv
 backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
-from database import get_db_connection, get_database_type
+from database import get_db_connection, get_database_type, refresh_latest_bill_compliance
 
 # Load environment variables
 load_dotenv()
 
+# Per-transaction limits for DDL, so a statement stuck behind another lock
+# fails fast instead of queueing every writer behind it
+INDEX_LOCK_TIMEOUT = '5s'
+DDL_STATEMENT_TIMEOUT = '30min'
+# Only raised for index builds (sort-heavy)
+DDL_MAINTENANCE_WORK_MEM = '1GB'
 
-def create_partition_index():
+
+def set_ddl_limits(cursor, lock_timeout, maintenance_work_mem=None):
+    """
+    Apply lock/statement timeouts (and optionally maintenance_work_mem) for DDL.
+    The script's connections are autocommit, so these are session settings;
+    main() resets them before the connection goes back to the pool.
+    """
+    cursor.execute(f"SET lock_timeout = '{lock_timeout}'")
+    cursor.execute(f"SET statement_timeout = '{DDL_STATEMENT_TIMEOUT}'")
+    if maintenance_work_mem:
+        cursor.execute(f"SET maintenance_work_mem = '{maintenance_work_mem}'")
+
+
+# Same definitions as init_compliance_database() uses for a new table
+COMMITTEE_INDEXES = (
+    ('idx_bill_compliance_committee_bill_date', 'bill_compliance (committee_id, bill_id, generated_at DESC)'),
+    ('idx_bill_compliance_committee_date', 'bill_compliance (committee_id, generated_at DESC)'),
+)
+
+
+# Single-column indexes whose lookups the composite index alongside them
+# now serves (it leads with the same column)
+REPLACED_INDEXES = (
+    ('idx_bill_compliance_committee', 'idx_bill_compliance_committee_bill_date'),
+    ('idx_bill_compliance_bill', 'idx_bill_compliance_bill_committee_date'),
+)
+
+
+def drop_replaced_indexes(cursor):
+    """Drop the replaced single-column indexes once their composite replacement is valid"""
+    for old_index, replacement in REPLACED_INDEXES:
+        cursor.execute('''
+            SELECT i.indisvalid
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = %s
+        ''', (replacement,))
+        row = cursor.fetchone()
+        if not (row and row[0]):
+            print(f"⚠️  Keeping '{old_index}': '{replacement}' is missing or invalid")
+            continue
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {old_index}')
+        print(f"✅ Index '{old_index}' dropped (or was already gone); '{replacement}' covers it")
+
+
+def create_partition_index(conn, verbose=False):
     """Create optimized index for ROW_NUMBER() window partition pattern (non-blocking)"""
     db_type = get_database_type()
     if db_type != 'postgresql':
@@ -36,45 +90,47 @@ def create_partition_index():
         return False
     
     print("\n" + "="*60)
-    print("CREATING PARTITION INDEX (CONCURRENTLY)")
+    print("CREATING COMPLIANCE INDEXES (CONCURRENTLY)")
     print("="*60)
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Check if index already exists
+    cursor = conn.cursor()
+    
+    # Create the optimized index CONCURRENTLY to avoid table lock
+    # IF NOT EXISTS makes this a no-op when the index is already there
+    # (note it also skips an INVALID index left by a failed build; drop that first)
+    # Using generated_at (actual column name) instead of updated_at
+    print("Creating index concurrently (this may take a while on large tables)...")
+    print("   This will not lock the table during creation.")
+    
+    from psycopg2.errors import LockNotAvailable
+    
+    try:
+        set_ddl_limits(cursor, INDEX_LOCK_TIMEOUT, DDL_MAINTENANCE_WORK_MEM)
         cursor.execute('''
-            SELECT EXISTS (
-                SELECT 1 FROM pg_indexes 
-                WHERE tablename = 'bill_compliance' 
-                AND indexname = 'bc_latest_idx'
-            )
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS bc_latest_idx
+            ON bill_compliance (bill_id, committee_id, generated_at DESC NULLS LAST)
         ''')
-        exists = cursor.fetchone()[0]
-        
-        if exists:
-            print("✅ Index 'bc_latest_idx' already exists")
-            return True
-        
-        # Create the optimized index CONCURRENTLY to avoid table lock
-        # Note: CONCURRENTLY cannot be used with IF NOT EXISTS, so we check first
-        # Using generated_at (actual column name) instead of updated_at
-        print("Creating index concurrently (this may take a while on large tables)...")
-        print("   This will not lock the table during creation.")
-        
-        try:
-            cursor.execute('''
-                CREATE INDEX CONCURRENTLY bc_latest_idx
-                ON bill_compliance (bill_id, committee_id, generated_at DESC NULLS LAST)
-            ''')
-            print("✅ Created index: bc_latest_idx (concurrent)")
-            print("   This index optimizes ROW_NUMBER() OVER (PARTITION BY bill_id, committee_id ORDER BY generated_at DESC)")
-            print("   NULLS LAST ensures NULL generated_at values are sorted last")
-        except Exception as e:
-            print(f"⚠️  Error creating index: {e}")
-            print("   Index may already exist or be in progress. Check status with --status")
-            return False
-        
+        print("✅ Index 'bc_latest_idx' is in place (concurrent)")
+        print("   This index optimizes ROW_NUMBER() OVER (PARTITION BY bill_id, committee_id ORDER BY generated_at DESC)")
+        print("   NULLS LAST ensures NULL generated_at values are sorted last")
+        
+        # Committee-first indexes; init_compliance_database() only creates
+        # these on a new bill_compliance, where the build can't block ingest
+        for index_name, definition in COMMITTEE_INDEXES:
+            cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {definition}')
+            print(f"✅ Index '{index_name}' is in place (concurrent)")
+        
+        drop_replaced_indexes(cursor)
+    except LockNotAvailable:
+        print(f"⚠️  Could not lock bill_compliance within {INDEX_LOCK_TIMEOUT}; another session holds a conflicting lock")
+        print("   Retry when ingest/cleanup jobs are idle")
+        return False
+    except Exception as e:
+        print(f"⚠️  Error creating index: {e}")
+        print("   Index may already exist or be in progress. Check status with --status")
+        return False
+    
+    if verbose:
         # Verify index was created
         cursor.execute('''
             SELECT indexname, indexdef 
@@ -85,131 +141,172 @@ def create_partition_index():
         result = cursor.fetchone()
         if result:
             print(f"   Index definition: {result[1]}")
-        
-        return True
+    
+    return True
 
 
-def create_materialized_view():
-    """Create materialized view for latest bills with proper unique index"""
-    db_type = get_database_type()
-    if db_type != 'postgresql':
-        print("⚠️  This optimization is for PostgreSQL only. Current database type:", db_type)
+@contextmanager
+def get_auth_db_connection():
+    """
+    Autocommit connection to the auth database (AUTH_DATABASE_URL).
+    Signing keys live there rather than in the compliance database.
+    """
+    import psycopg2
+    
+    db_url = os.getenv('AUTH_DATABASE_URL', '')
+    if db_url.startswith('postgres://'):
+        db_url = db_url.replace('postgres://', 'postgresql://', 1)
+    
+    conn = psycopg2.connect(db_url)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def create_active_keys_index():
+    """Create partial index for listing a user's active signing keys (non-blocking)"""
+    auth_db_url = os.getenv('AUTH_DATABASE_URL', '')
+    if not auth_db_url.startswith('postgres'):
+        print("⚠️  This optimization is for PostgreSQL only. AUTH_DATABASE_URL is not a PostgreSQL URL")
         return False
     
     print("\n" + "="*60)
-    print("CREATING MATERIALIZED VIEW")
+    print("CREATING SIGNING KEY INDEXES (CONCURRENTLY)")
     print("="*60)
     
-    with get_db_connection() as conn:
+    with get_auth_db_connection() as conn:
         cursor = conn.cursor()
         
-        # Drop existing view if it exists (to ensure clean recreation)
-        cursor.execute('''
-            DROP MATERIALIZED VIEW IF EXISTS latest_bills_mv CASCADE
-        ''')
-        
-        # Create materialized view with DISTINCT ON and proper ordering
-        # NULLS LAST ensures NULL generated_at values are sorted last
-        cursor.execute('''
-            CREATE MATERIALIZED VIEW latest_bills_mv AS
-            SELECT DISTINCT ON (bill_id, committee_id)
-                bc.id,
-                bc.committee_id,
-                bc.bill_id,
-                bc.hearing_date,
-                bc.deadline_60,
-                bc.effective_deadline,
-                bc.extension_order_url,
-                bc.extension_date,
-                bc.reported_out,
-                bc.summary_present,
-                bc.summary_url,
-                bc.votes_present,
-                bc.votes_url,
-                bc.state,
-                bc.reason,
-                bc.notice_status,
-                bc.notice_gap_days,
-                bc.announcement_date,
-                bc.scheduled_hearing_date,
-                bc.generated_at
-            FROM bill_compliance bc
-            ORDER BY bill_id, committee_id, generated_at DESC NULLS LAST
-        ''')
+        # Matches the default key listing: WHERE user_id = ? AND revoked_at IS NULL
+        # ORDER BY created_at DESC, so it's an in-order index scan with no sort.
+        # key_id lookups are already covered by the model's unique index.
+        from psycopg2.errors import LockNotAvailable
         
-        print("✅ Created materialized view: latest_bills_mv")
+        try:
+            set_ddl_limits(cursor, INDEX_LOCK_TIMEOUT, DDL_MAINTENANCE_WORK_MEM)
+            cursor.execute('''
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS sk_user_active_idx
+                ON signing_keys (user_id, created_at DESC)
+                WHERE revoked_at IS NULL
+            ''')
+            print("✅ Index 'sk_user_active_idx' is in place (concurrent)")
+        except LockNotAvailable:
+            print(f"⚠️  Could not lock signing_keys within {INDEX_LOCK_TIMEOUT}; another session holds a conflicting lock")
+            return False
+        except Exception as e:
+            print(f"⚠️  Error creating index: {e}")
+            return False
         
-        # REQUIRED: Create unique index for concurrent refresh
-        # This MUST exist before REFRESH MATERIALIZED VIEW CONCURRENTLY will work
-        cursor.execute('''
-            CREATE UNIQUE INDEX latest_bills_mv_uq
-            ON latest_bills_mv (bill_id, committee_id)
-        ''')
-        print("✅ Created unique index: latest_bills_mv_uq (required for concurrent refresh)")
+        # Refresh statistics so the planner considers the new partial index
+        cursor.execute('ANALYZE signing_keys')
+        print("✅ ANALYZE completed on signing_keys")
         
-        # Create additional indexes for query performance
-        cursor.execute('''
-            CREATE INDEX latest_bills_mv_committee_idx
-            ON latest_bills_mv (committee_id)
-        ''')
-        print("✅ Created index: latest_bills_mv_committee_idx")
+        return True
+
+
+def create_saved_view_indexes():
+    """Create the saved_views indexes on existing auth databases (non-blocking)"""
+    auth_db_url = os.getenv('AUTH_DATABASE_URL', '')
+    if not auth_db_url.startswith('postgres'):
+        print("⚠️  This optimization is for PostgreSQL only. AUTH_DATABASE_URL is not a PostgreSQL URL")
+        return False
+    
+    print("\n" + "="*60)
+    print("CREATING SAVED VIEW INDEXES (CONCURRENTLY)")
+    print("="*60)
+    
+    # Same definitions as SavedView.__table_args__ (create_all only adds them
+    # to new tables): unique names per user, which creating a view relies
+    # on, the per-user listing sorted by updated_at, and case-insensitive
+    # prefix search
+    indexes = (
+        ('uq_saved_views_user_name', 'UNIQUE INDEX', 'saved_views (user_id, name)'),
+        ('idx_saved_views_user_updated', 'INDEX', 'saved_views (user_id, updated_at DESC)'),
+        ('idx_saved_views_user_lower_name', 'INDEX', 'saved_views (user_id, lower(name) text_pattern_ops)'),
+    )
+    
+    with get_auth_db_connection() as conn:
+        cursor = conn.cursor()
         
-        # Get row count
-        cursor.execute('SELECT COUNT(*) FROM latest_bills_mv')
-        count = cursor.fetchone()[0]
-        print(f"   Materialized view contains {count:,} rows")
+        from psycopg2.errors import LockNotAvailable, UniqueViolation
+        
+        set_ddl_limits(cursor, INDEX_LOCK_TIMEOUT, DDL_MAINTENANCE_WORK_MEM)
+        for index_name, index_type, definition in indexes:
+            try:
+                cursor.execute(f'CREATE {index_type} CONCURRENTLY IF NOT EXISTS {index_name} ON {definition}')
+                print(f"✅ Index '{index_name}' is in place (concurrent)")
+            except LockNotAvailable:
+                print(f"⚠️  Could not lock saved_views within {INDEX_LOCK_TIMEOUT}; another session holds a conflicting lock")
+                return False
+            except UniqueViolation as e:
+                print(f"⚠️  Duplicate saved view names prevent building {index_name}: {e}")
+                print(f"   Rename the duplicates, DROP INDEX {index_name} (left invalid) and run this again")
+                return False
+            except Exception as e:
+                print(f"⚠️  Error creating index {index_name}: {e}")
+                return False
+        
+        cursor.execute('ANALYZE saved_views')
+        print("✅ ANALYZE completed on saved_views")
         
         return True
 
 
-def refresh_materialized_view():
-    """Refresh the materialized view (use CONCURRENTLY to avoid locking)"""
+def refresh_latest_rows(conn, rebuild=False):
+    """Catch latest_bill_compliance up with bill_compliance (or rebuild it from scratch)"""
     db_type = get_database_type()
     if db_type != 'postgresql':
         print("⚠️  This optimization is for PostgreSQL only. Current database type:", db_type)
         return False
     
     print("\n" + "="*60)
-    print("REFRESHING MATERIALIZED VIEW")
+    print("REBUILDING LATEST BILL ROWS" if rebuild else "REFRESHING LATEST BILL ROWS")
     print("="*60)
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Check if view exists
-        cursor.execute('''
-            SELECT EXISTS (
-                SELECT 1 FROM pg_matviews 
-                WHERE matviewname = 'latest_bills_mv'
-            )
-        ''')
-        exists = cursor.fetchone()[0]
-        
-        if not exists:
-            print("⚠️  Materialized view 'latest_bills_mv' does not exist.")
-            print("   Run with --create-view first to create it.")
-            return False
-        
-        # Refresh concurrently (requires unique index, which we have on (bill_id, committee_id))
-        try:
-            cursor.execute('REFRESH MATERIALIZED VIEW CONCURRENTLY latest_bills_mv')
-            print("✅ Refreshed materialized view (concurrent)")
-        except Exception as e:
-            # If concurrent refresh fails (e.g., no unique index), try regular refresh
-            print(f"⚠️  Concurrent refresh failed: {e}")
-            print("   Attempting regular refresh (may lock table)...")
-            cursor.execute('REFRESH MATERIALIZED VIEW latest_bills_mv')
-            print("✅ Refreshed materialized view (regular)")
-        
-        # Get row count
-        cursor.execute('SELECT COUNT(*) FROM latest_bills_mv')
-        count = cursor.fetchone()[0]
-        print(f"   Materialized view now contains {count:,} rows")
-        
-        return True
+    # Runs on its own pooled connection and transaction; the advisory lock
+    # keeps two maintenance runs from merging at once
+    if not refresh_latest_bill_compliance(rebuild=rebuild):
+        print("⚠️  Merge into latest_bill_compliance failed")
+        return False
+    print("✅ Rebuilt latest_bill_compliance" if rebuild else "✅ Merged new rows into latest_bill_compliance")
+    
+    cursor = conn.cursor()
+    cursor.execute('SELECT COUNT(*) FROM latest_bill_compliance')
+    count = cursor.fetchone()[0]
+    print(f"   latest_bill_compliance contains {count:,} rows")
+    
+    return True
+
+
+def drop_legacy_view(conn):
+    """Drop latest_bills_mv, which ingest no longer refreshes"""
+    db_type = get_database_type()
+    if db_type != 'postgresql':
+        print("⚠️  This optimization is for PostgreSQL only. Current database type:", db_type)
+        return False
+    
+    print("\n" + "="*60)
+    print("DROPPING LEGACY MATERIALIZED VIEW")
+    print("="*60)
+    
+    from psycopg2.errors import LockNotAvailable
+    
+    cursor = conn.cursor()
+    try:
+        set_ddl_limits(cursor, INDEX_LOCK_TIMEOUT)
+        cursor.execute('DROP MATERIALIZED VIEW IF EXISTS latest_bills_mv')
+    except LockNotAvailable:
+        print(f"⚠️  Could not lock latest_bills_mv within {INDEX_LOCK_TIMEOUT}; retry when it's idle")
+        return False
+    print("✅ latest_bills_mv dropped (or was already gone)")
+    
+    return True
 
 
-def run_vacuum_analyze():
+def run_vacuum_analyze(conn):
     """Run VACUUM ANALYZE on bill_compliance table"""
     db_type = get_database_type()
     if db_type != 'postgresql':
@@ -220,23 +317,23 @@ def run_vacuum_analyze():
     print("RUNNING VACUUM ANALYZE")
     print("="*60)
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        print("Running VACUUM ANALYZE on bill_compliance...")
-        cursor.execute('VACUUM ANALYZE bill_compliance')
-        print("✅ VACUUM ANALYZE completed on bill_compliance")
-        
-        # Also analyze the materialized view
-        print("Running ANALYZE on latest_bills_mv...")
-        cursor.execute('ANALYZE latest_bills_mv')
-        print("✅ ANALYZE completed on latest_bills_mv")
-        print("   This updates table statistics for better query planning")
-        
-        return True
+    cursor = conn.cursor()
+    
+    print("Running VACUUM ANALYZE on bill_compliance...")
+    cursor.execute('VACUUM ANALYZE bill_compliance')
+    print("✅ VACUUM ANALYZE completed on bill_compliance")
+    
+    # The latest-rows table is upserted on every --refresh-latest run, so it
+    # collects dead tuples too
+    print("Running VACUUM ANALYZE on latest_bill_compliance...")
+    cursor.execute('VACUUM ANALYZE latest_bill_compliance')
+    print("✅ VACUUM ANALYZE completed on latest_bill_compliance")
+    print("   This updates table statistics for better query planning")
+    
+    return True
 
 
-def get_optimization_status():
+def get_optimization_status(conn):
     """Check current optimization status"""
     db_type = get_database_type()
     if db_type != 'postgresql':
@@ -247,65 +344,172 @@ def get_optimization_status():
     print("OPTIMIZATION STATUS")
     print("="*60)
     
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        # Check for partition index (new name)
-        cursor.execute('''
-            SELECT EXISTS (
-                SELECT 1 FROM pg_indexes 
-                WHERE tablename = 'bill_compliance' 
-                AND indexname = 'bc_latest_idx'
-            )
-        ''')
-        has_index = cursor.fetchone()[0]
-        print(f"Partition Index (bc_latest_idx): {'✅ Exists' if has_index else '❌ Missing'}")
-        
-        # Also check for old index name for backwards compatibility
-        cursor.execute('''
-            SELECT EXISTS (
-                SELECT 1 FROM pg_indexes 
-                WHERE tablename = 'bill_compliance' 
-                AND indexname = 'bill_compliance_partition_idx'
-            )
-        ''')
-        has_old_index = cursor.fetchone()[0]
-        if has_old_index:
-            print(f"   (Old index 'bill_compliance_partition_idx' also exists - consider dropping)")
-        
-        # Check for materialized view
-        cursor.execute('''
-            SELECT EXISTS (
-                SELECT 1 FROM pg_matviews 
-                WHERE matviewname = 'latest_bills_mv'
-            )
-        ''')
-        has_view = cursor.fetchone()[0]
-        print(f"Materialized View: {'✅ Exists' if has_view else '❌ Missing'}")
-        
-        if has_view:
-            cursor.execute('SELECT COUNT(*) FROM latest_bills_mv')
-            view_count = cursor.fetchone()[0]
-            cursor.execute('SELECT COUNT(*) FROM bill_compliance')
-            table_count = cursor.fetchone()[0]
-            print(f"   View rows: {view_count:,}")
-            print(f"   Table rows: {table_count:,}")
-        
-        # Check table statistics
+    cursor = conn.cursor()
+    
+    # Check for partition index (new name)
+    cursor.execute('''
+        SELECT EXISTS (
+            SELECT 1 FROM pg_indexes 
+            WHERE tablename = 'bill_compliance' 
+            AND indexname = 'bc_latest_idx'
+        )
+    ''')
+    has_index = cursor.fetchone()[0]
+    print(f"Partition Index (bc_latest_idx): {'✅ Exists' if has_index else '❌ Missing'}")
+    
+    # Also check for old index name for backwards compatibility
+    cursor.execute('''
+        SELECT EXISTS (
+            SELECT 1 FROM pg_indexes 
+            WHERE tablename = 'bill_compliance' 
+            AND indexname = 'bill_compliance_partition_idx'
+        )
+    ''')
+    has_old_index = cursor.fetchone()[0]
+    if has_old_index:
+        print(f"   (Old index 'bill_compliance_partition_idx' also exists - consider dropping)")
+    
+    # Latest-rows table, merged by --refresh-latest up to the watermark
+    cursor.execute('''
+        SELECT (SELECT COUNT(*) FROM latest_bill_compliance),
+               (SELECT COUNT(*) FROM bill_compliance),
+               (SELECT latest_bills_watermark FROM ingest_state WHERE id = 1),
+               (SELECT MAX(generated_at) FROM bill_compliance)
+    ''')
+    latest_count, table_count, watermark, newest = cursor.fetchone()
+    print(f"Latest bill rows (latest_bill_compliance): {latest_count:,}")
+    print(f"   bill_compliance rows: {table_count:,}")
+    print(f"   Merged up to: {watermark or 'never'}")
+    if newest and (watermark is None or newest > watermark):
+        print(f"   ⚠️  Rows up to {newest} not merged yet; run --refresh-latest")
+    
+    cursor.execute('''
+        SELECT EXISTS (
+            SELECT 1 FROM pg_matviews 
+            WHERE matviewname = 'latest_bills_mv'
+        )
+    ''')
+    if cursor.fetchone()[0]:
+        print("   (Old materialized view 'latest_bills_mv' still exists and is no longer refreshed - drop it with --drop-view)")
+    
+    # Check table statistics
+    cursor.execute('''
+        SELECT n_live_tup, n_dead_tup, last_vacuum, last_autovacuum, last_analyze, last_autoanalyze
+        FROM pg_stat_user_tables
+        WHERE relname = 'bill_compliance'
+    ''')
+    stats = cursor.fetchone()
+    if stats:
+        print(f"\nTable Statistics:")
+        print(f"   Live tuples: {stats[0]:,}")
+        print(f"   Dead tuples: {stats[1]:,}")
+        if stats[2]:
+            print(f"   Last vacuum: {stats[2]}")
+        if stats[4]:
+            print(f"   Last analyze: {stats[4]}")
+    
+    if ensure_pg_stat_statements(cursor):
+        print_top_statements(cursor)
+    
+    explain_latest_bills_query(cursor)
+
+
+# Latest-row-per-bill pattern used throughout app.py (the query bc_latest_idx serves)
+LATEST_BILLS_QUERY = '''
+    SELECT * FROM (
+        SELECT bc.*,
+               ROW_NUMBER() OVER (PARTITION BY bc.bill_id, bc.committee_id ORDER BY bc.generated_at DESC NULLS LAST) AS rn
+        FROM bill_compliance bc
+    ) ranked
+    WHERE rn = 1
+'''
+
+TOP_STATEMENTS_LIMIT = 10
+
+
+def ensure_pg_stat_statements(cursor):
+    """Check whether pg_stat_statements is installed, printing setup steps if not"""
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements')")
+    if cursor.fetchone()[0]:
+        return True
+    
+    print("\npg_stat_statements: ❌ Not installed (no per-query timings available)")
+    print("   Add 'pg_stat_statements' to shared_preload_libraries, restart, then run:")
+    print("   CREATE EXTENSION pg_stat_statements;")
+    return False
+
+
+def print_top_statements(cursor):
+    """Print the most expensive recorded statements touching bill_compliance"""
+    try:
         cursor.execute('''
-            SELECT n_live_tup, n_dead_tup, last_vacuum, last_autovacuum, last_analyze, last_autoanalyze
-            FROM pg_stat_user_tables
-            WHERE relname = 'bill_compliance'
-        ''')
-        stats = cursor.fetchone()
-        if stats:
-            print(f"\nTable Statistics:")
-            print(f"   Live tuples: {stats[0]:,}")
-            print(f"   Dead tuples: {stats[1]:,}")
-            if stats[2]:
-                print(f"   Last vacuum: {stats[2]}")
-            if stats[4]:
-                print(f"   Last analyze: {stats[4]}")
+            SELECT query, calls, mean_exec_time, rows
+            FROM pg_stat_statements
+            WHERE query ILIKE '%%bill_compliance%%'
+            ORDER BY total_exec_time DESC
+            LIMIT %s
+        ''', (TOP_STATEMENTS_LIMIT,))
+    except Exception as e:
+        # e.g. not in shared_preload_libraries, or pre-13 column names
+        print(f"\n⚠️  Could not read pg_stat_statements: {e}")
+        return
+    
+    rows = cursor.fetchall()
+    print(f"\nTop {TOP_STATEMENTS_LIMIT} statements on bill_compliance (by total time):")
+    if not rows:
+        print("   (none recorded yet)")
+    for query, calls, mean_ms, row_count in rows:
+        query_text = ' '.join(query.split())
+        if len(query_text) > 100:
+            query_text = query_text[:97] + '...'
+        print(f"   {calls:>8,} calls  {mean_ms:>10.2f} ms avg  {row_count:>10,} rows  {query_text}")
+
+
+def _plan_nodes(plan):
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree"""
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def explain_latest_bills_query(cursor):
+    """EXPLAIN ANALYZE the latest-bills query and report whether bc_latest_idx is used"""
+    print("\nLatest-bills query plan (EXPLAIN ANALYZE):")
+    cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + LATEST_BILLS_QUERY)
+    explain = cursor.fetchone()[0][0]
+    
+    scans = [
+        node for node in _plan_nodes(explain['Plan'])
+        if node.get('Relation Name') == 'bill_compliance'
+    ]
+    for node in scans:
+        index_name = node.get('Index Name')
+        print(f"   {node['Node Type']}" + (f" using {index_name}" if index_name else ''))
+    print(f"   Execution time: {explain['Execution Time']:.2f} ms")
+    
+    if any(node.get('Index Name') == 'bc_latest_idx' for node in scans):
+        print("   ✅ Query uses bc_latest_idx")
+    elif any(node['Node Type'] == 'Seq Scan' for node in scans):
+        print("   ⚠️  Query does a Seq Scan on bill_compliance (expected on small tables;")
+        print("      otherwise check --create-index and run --vacuum to refresh statistics)")
+
+
+def run_compliance_steps(conn, args):
+    """Run the requested compliance-database optimizations on one connection"""
+    if args.status or args.all:
+        get_optimization_status(conn)
+    
+    if args.create_index or args.all:
+        create_partition_index(conn, verbose=args.verbose)
+    
+    if args.refresh_latest or args.rebuild_latest or args.all:
+        refresh_latest_rows(conn, rebuild=args.rebuild_latest)
+    
+    if args.drop_view:
+        drop_legacy_view(conn)
+    
+    if args.vacuum or args.all:
+        run_vacuum_analyze(conn)
 
 
 def main():
@@ -318,35 +522,54 @@ Examples:
   python backend/optimize_postgres.py --status
   
   # Create all optimizations
-  python backend/optimize_postgres.py --create-index --create-view
+  python backend/optimize_postgres.py --create-index --refresh-latest
   
-  # Refresh materialized view after data ingest
-  python backend/optimize_postgres.py --refresh-view
+  # Rebuild latest_bill_compliance from bill_compliance (e.g. after a manual cleanup)
+  python backend/optimize_postgres.py --rebuild-latest
+  
+  # Drop the old latest_bills_mv materialized view
+  python backend/optimize_postgres.py --drop-view
   
   # Run maintenance
   python backend/optimize_postgres.py --vacuum
   
+  # Create signing key indexes (auth database)
+  python backend/optimize_postgres.py --create-key-indexes
+  
+  # Create saved view indexes (auth database)
+  python backend/optimize_postgres.py --create-saved-view-indexes
+  
   # Do everything
   python backend/optimize_postgres.py --all
         """
     )
     parser.add_argument('--create-index', action='store_true',
-                       help='Create optimized partition index')
-    parser.add_argument('--create-view', action='store_true',
-                       help='Create materialized view for latest bills')
-    parser.add_argument('--refresh-view', action='store_true',
-                       help='Refresh the materialized view')
+                       help='Create optimized partition and per-committee indexes')
+    parser.add_argument('--refresh-latest', action='store_true',
+                       help='Merge new bill_compliance rows into latest_bill_compliance')
+    parser.add_argument('--rebuild-latest', action='store_true',
+                       help='Empty and fully rebuild latest_bill_compliance')
+    parser.add_argument('--drop-view', action='store_true',
+                       help='Drop the old latest_bills_mv materialized view')
     parser.add_argument('--vacuum', action='store_true',
-                       help='Run VACUUM ANALYZE on bill_compliance')
+                       help='Run VACUUM ANALYZE on bill_compliance and latest_bill_compliance')
+    parser.add_argument('--create-key-indexes', action='store_true',
+                       help='Create partial index for active signing keys (auth database)')
+    parser.add_argument('--create-saved-view-indexes', action='store_true',
+                       help='Create saved view listing/search indexes (auth database)')
     parser.add_argument('--status', action='store_true',
                        help='Show current optimization status')
     parser.add_argument('--all', action='store_true',
-                       help='Create index, view, and run vacuum')
+                       help='Create indexes, merge latest rows, and run vacuum')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Print extra detail (e.g. index definitions)')
     
     args = parser.parse_args()
     
-    if not any([args.create_index, args.create_view, args.refresh_view, 
-                args.vacuum, args.status, args.all]):
+    if not any([args.create_index, args.refresh_latest, args.rebuild_latest,
+                args.drop_view,
+                args.vacuum, args.create_key_indexes, args.create_saved_view_indexes,
+                args.status, args.all]):
         parser.print_help()
         return
     
@@ -362,20 +585,25 @@ Examples:
             return
     
     try:
-        if args.status or args.all:
-            get_optimization_status()
-        
-        if args.create_index or args.all:
-            create_partition_index()
-        
-        if args.create_view or args.all:
-            create_materialized_view()
-        
-        if args.refresh_view:
-            refresh_materialized_view()
-        
-        if args.vacuum or args.all:
-            run_vacuum_analyze()
+        # One connection for every compliance-database step
+        with get_db_connection() as conn:
+            if db_type == 'postgresql':
+                # CREATE INDEX CONCURRENTLY and VACUUM can't run inside a
+                # transaction block, so the whole script runs in autocommit
+                conn.set_session(autocommit=True)
+            try:
+                run_compliance_steps(conn, args)
+            finally:
+                if db_type == 'postgresql':
+                    # Don't hand session settings back to the pool
+                    conn.cursor().execute('RESET ALL')
+                    conn.set_session(autocommit=False)
+        
+        if args.create_key_indexes or args.all:
+            create_active_keys_index()
+        
+        if args.create_saved_view_indexes or args.all:
+            create_saved_view_indexes()
         
         print("\n" + "="*60)
         print("✅ Optimization complete!")
@@ -12,14 +12,22 @@ from pathlib import Path
 backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
-from flask import Flask
-from auth_models import db, User
-from werkzeug.security import generate_password_hash
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables (before auth_models reads PW_HASH_METHOD)
 load_dotenv()
 
+from flask import Flask
+from auth_models import db, User, PW_HASH_METHOD
+from werkzeug.security import generate_password_hash
+
+
+def hash_password(password):
+    """Hash a password with PW_HASH_METHOD, reporting the scheme used"""
+    pw_hash = generate_password_hash(password, method=PW_HASH_METHOD)
+    print(f"🔑 Password hashed with {pw_hash.split('$', 1)[0]}")
+    return pw_hash
+
 
 def create_temp_app():
     """Create a temporary Flask app for database operations"""
@@ -35,10 +43,8 @@ def create_temp_app():
     return app
 
 
-def delete_default_admin():
+def delete_default_admin(app):
     """Delete the insecure default admin user"""
-    app = create_temp_app()
-    
     with app.app_context():
         # Find the default admin
         default_admin = User.query.filter_by(email='admin@example.com').first()
@@ -58,10 +64,8 @@ def delete_default_admin():
             return False
 
 
-def create_secure_admin():
+def create_secure_admin(app):
     """Create admin user with credentials from environment variables"""
-    app = create_temp_app()
-    
     with app.app_context():
         admin_email = os.getenv('ADMIN_EMAIL')
         admin_password = os.getenv('ADMIN_PASSWORD')
@@ -77,7 +81,7 @@ def create_secure_admin():
             print(f"ℹ️  Admin user already exists: {admin_email}")
             print(f"   Updating password...")
             
-            existing_admin.pw_hash = generate_password_hash(admin_password)
+            existing_admin.pw_hash = hash_password(admin_password)
             existing_admin.is_active = True
             existing_admin.role = User.ROLE_ADMIN
             db.session.commit()
@@ -88,7 +92,7 @@ def create_secure_admin():
         # Create new admin
         admin_user = User(
             email=admin_email,
-            pw_hash=generate_password_hash(admin_password),
+            pw_hash=hash_password(admin_password),
             role=User.ROLE_ADMIN,
             is_active=True
         )
@@ -99,10 +103,8 @@ def create_secure_admin():
         return True
 
 
-def list_all_admins():
+def list_all_admins(app):
     """List all admin users"""
-    app = create_temp_app()
-    
     with app.app_context():
         admins = User.query.filter_by(role=User.ROLE_ADMIN).all()
         
@@ -139,12 +141,16 @@ def main():
     
     command = sys.argv[1]
     
+    # One app (and database engine/connection pool) shared by every step,
+    # so --fix-now doesn't connect twice
+    app = create_temp_app()
+    
     if command == '--list':
-        list_all_admins()
+        list_all_admins(app)
     
     elif command == '--delete-default':
         print("\n🗑️  Deleting insecure default admin...\n")
-        if delete_default_admin():
+        if delete_default_admin(app):
             print("\n✅ Done! The insecure admin has been removed.")
             print("   Run with --create-secure to create a secure admin.")
         else:
@@ -152,7 +158,7 @@ def main():
     
     elif command == '--create-secure':
         print("\n🔐 Creating/updating secure admin...\n")
-        if create_secure_admin():
+        if create_secure_admin(app):
             print("\n✅ Done! Secure admin is ready.")
             print("\nTest login with your ADMIN_EMAIL and ADMIN_PASSWORD.")
         else:
@@ -163,11 +169,11 @@ def main():
         
         # Step 1: Delete default
         print("Step 1: Removing insecure default admin...")
-        delete_default_admin()
+        delete_default_admin(app)
         
         # Step 2: Create secure
         print("\nStep 2: Creating secure admin...")
-        if create_secure_admin():
+        if create_secure_admin(app):
             print("\n" + "=" * 80)
             print("✅ SECURITY ISSUE FIXED!")
             print("=" * 80)
@@ -3,11 +3,14 @@ Security and CORS Configuration
 Handles CORS settings, rate limiting, and security headers
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from sqlalchemy.exc import SQLAlchemyError
 import os
+import re
+import orjson
 from datetime import timedelta
 
 
@@ -15,21 +18,22 @@ def init_cors(app: Flask):
     """Initialize CORS configuration"""
     # Get allowed origins from environment or use defaults
     frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
-    allowed_origins = [
+    # dict keys: de-duplicated, but in a stable order for the log line below
+    allowed_origins = dict.fromkeys([
         frontend_url,
         'http://localhost:3000',  # Alternative React dev server
         'http://localhost:5173',  # Vite dev server
         'http://127.0.0.1:5173',  # Alternative localhost
         'https://beaconhilltracker.org',  # Production frontend
         'https://www.beaconhilltracker.org',  # Production frontend with www
-    ]
+    ])
     
     # Add production origins if specified
-    production_origins = os.getenv('CORS_ORIGINS', '').split(',')
-    for origin in production_origins:
-        origin = origin.strip()
-        if origin and origin not in allowed_origins:
-            allowed_origins.append(origin)
+    allowed_origins.update(dict.fromkeys(
+        origin.strip() for origin in os.getenv('CORS_ORIGINS', '').split(',')
+        if origin.strip()
+    ))
+    allowed_origins = list(allowed_origins)
     
     # Log CORS configuration for debugging
     app.logger.info(f"CORS allowed origins: {allowed_origins}")
@@ -47,32 +51,29 @@ def init_cors(app: Flask):
              'X-CSRF-Token',
              'X-Ingest-Key-Id',
              'X-Ingest-Timestamp',
-             'X-Ingest-Signature'
+             'X-Ingest-Signature',
+             'If-None-Match'
          ],
+         expose_headers=['ETag'],
          supports_credentials=True,
          max_age=timedelta(hours=24))
     
     return app
 
 
+# Health check and debug endpoints are exempt from rate limiting
+RATE_LIMIT_EXEMPT_PATHS = frozenset({'/health', '/debug/db-info'})
+
+
 def init_rate_limiter(app: Flask):
     """Initialize rate limiting"""
     # Get rate limit storage from config
     storage_url = app.config.get('RATELIMIT_STORAGE_URL', 'memory://')
     default_limits = app.config.get('RATELIMIT_DEFAULT', '100 per hour')
     
-    # Custom key function that exempts certain paths
-    def get_rate_limit_key():
-        """Get key for rate limiting, returning None for exempt paths"""
-        # Exempt health check and debug endpoints
-        exempt_paths = ['/health', '/debug/db-info']
-        if request.path in exempt_paths:
-            return None  # None means exempt from rate limiting
-        return get_remote_address()
-    
     # Initialize limiter
     limiter = Limiter(
-        key_func=get_rate_limit_key,
+        key_func=get_remote_address,
         storage_uri=storage_url,
         default_limits=[default_limits],
         headers_enabled=True,
@@ -80,6 +81,12 @@ def init_rate_limiter(app: Flask):
     )
     limiter.init_app(app)
     
+    # Exempt paths skip every limit (a None key would also skip them, but
+    # Flask-Limiter logs an error per request for it)
+    @limiter.request_filter
+    def is_rate_limit_exempt():
+        return request.path in RATE_LIMIT_EXEMPT_PATHS
+    
     # Define rate limits for different endpoint types
     
     # Authentication endpoints - stricter limits
@@ -102,70 +109,92 @@ def init_rate_limiter(app: Flask):
     return limiter
 
 
+# Security headers that are the same on every response, built once
+SECURITY_HEADERS = {
+    # Content Security Policy
+    'Content-Security-Policy': (
+        "default-src 'self'; "
+        "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.plot.ly; "
+        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+        "font-src 'self' https://fonts.gstatic.com; "
+        "img-src 'self' data: https:; "
+        "connect-src 'self' https://api.github.com; "
+        "frame-ancestors 'none'; "
+        "base-uri 'self'; "
+        "form-action 'self'"
+    ),
+    # Prevent clickjacking
+    'X-Frame-Options': 'DENY',
+    # Prevent MIME type sniffing
+    'X-Content-Type-Options': 'nosniff',
+    # Enable XSS protection
+    'X-XSS-Protection': '1; mode=block',
+    # Referrer policy
+    'Referrer-Policy': 'strict-origin-when-cross-origin',
+    # Permissions policy (formerly Feature Policy)
+    'Permissions-Policy': (
+        "geolocation=(), "
+        "microphone=(), "
+        "camera=(), "
+        "payment=(), "
+        "usb=(), "
+        "magnetometer=(), "
+        "gyroscope=(), "
+        "speaker=()"
+    ),
+}
+
+# HSTS for HTTPS (only in production)
+HSTS_HEADERS = {
+    'Strict-Transport-Security': 'max-age=31536000; includeSubDomains; preload'
+}
+
+# Cache control for API responses
+NO_CACHE_PATH_PREFIXES = ('/api/', '/auth/')
+NO_CACHE_HEADERS = {
+    'Cache-Control': 'no-cache, no-store, must-revalidate',
+    'Pragma': 'no-cache',
+    'Expires': '0',
+}
+# Responses with an ETag may be stored by the browser but must be revalidated
+# (If-None-Match) on every use; no-store would make the 304 path unreachable
+REVALIDATE_CACHE_HEADERS = {
+    'Cache-Control': 'private, no-cache',
+}
+
+
 def init_security_headers(app: Flask):
     """Initialize security headers (helmet-style)"""
+    force_https = app.config.get('FORCE_HTTPS', False)
     
     @app.after_request
     def set_security_headers(response):
-        # Content Security Policy
-        csp_policy = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' https://cdn.plot.ly; "
-            "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-            "font-src 'self' https://fonts.gstatic.com; "
-            "img-src 'self' data: https:; "
-            "connect-src 'self' https://api.github.com; "
-            "frame-ancestors 'none'; "
-            "base-uri 'self'; "
-            "form-action 'self'"
-        )
-        response.headers['Content-Security-Policy'] = csp_policy
+        response.headers.update(SECURITY_HEADERS)
         
-        # Prevent clickjacking
-        response.headers['X-Frame-Options'] = 'DENY'
-        
-        # Prevent MIME type sniffing
-        response.headers['X-Content-Type-Options'] = 'nosniff'
-        
-        # Enable XSS protection
-        response.headers['X-XSS-Protection'] = '1; mode=block'
-        
-        # Referrer policy
-        response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        
-        # HSTS for HTTPS (only in production)
-        if request.is_secure or app.config.get('FORCE_HTTPS', False):
-            response.headers['Strict-Transport-Security'] = (
-                'max-age=31536000; includeSubDomains; preload'
-            )
-        
-        # Permissions policy (formerly Feature Policy)
-        permissions_policy = (
-            "geolocation=(), "
-            "microphone=(), "
-            "camera=(), "
-            "payment=(), "
-            "usb=(), "
-            "magnetometer=(), "
-            "gyroscope=(), "
-            "speaker=()"
-        )
-        response.headers['Permissions-Policy'] = permissions_policy
+        if force_https or request.is_secure:
+            response.headers.update(HSTS_HEADERS)
         
         # Remove server information
         response.headers.pop('Server', None)
         
-        # Cache control for API responses
-        if request.path.startswith('/api/') or request.path.startswith('/auth/'):
-            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
+        if request.path.startswith(NO_CACHE_PATH_PREFIXES):
+            if 'ETag' in response.headers:
+                response.headers.update(REVALIDATE_CACHE_HEADERS)
+            else:
+                response.headers.update(NO_CACHE_HEADERS)
         
         return response
     
     return app
 
 
+# Scanner user agents to block (basic protection), matched in a single pass
+SUSPICIOUS_AGENTS_RE = re.compile('sqlmap|nmap|nikto|masscan|zap', re.IGNORECASE)
+
+# Requests with a body that JSON API endpoints must send as application/json
+JSON_BODY_METHODS = frozenset({'POST', 'PUT', 'PATCH'})
+
+
 def init_request_validation(app: Flask):
     """Initialize request validation middleware"""
     
@@ -178,14 +207,13 @@ def init_request_validation(app: Flask):
             return jsonify({'error': 'Request entity too large'}), 413
         
         # Validate Content-Type for JSON endpoints
-        if request.method in ['POST', 'PUT', 'PATCH'] and request.path.startswith('/api/'):
+        if request.method in JSON_BODY_METHODS and request.path.startswith('/api/'):
             if not request.is_json and request.content_type != 'application/json':
                 return jsonify({'error': 'Content-Type must be application/json'}), 400
         
         # Block suspicious user agents (basic protection)
-        user_agent = request.headers.get('User-Agent', '').lower()
-        suspicious_agents = ['sqlmap', 'nmap', 'nikto', 'masscan', 'zap']
-        if any(agent in user_agent for agent in suspicious_agents):
+        user_agent = request.headers.get('User-Agent', '')
+        if SUSPICIOUS_AGENTS_RE.search(user_agent):
             return jsonify({'error': 'Forbidden'}), 403
         
         # Basic bot protection
@@ -195,64 +223,44 @@ def init_request_validation(app: Flask):
     return app
 
 
+# Global error responses never change, so their bodies are serialized once
+# (sorted keys + trailing newline, the same bytes jsonify() would produce)
+ERROR_MESSAGES = {
+    400: ('Bad Request', 'The request could not be understood by the server'),
+    401: ('Unauthorized', 'Authentication required'),
+    403: ('Forbidden', 'Insufficient permissions'),
+    404: ('Not Found', 'The requested resource was not found'),
+    405: ('Method Not Allowed', 'The method is not allowed for the requested URL'),
+    413: ('Payload Too Large', 'The request entity is too large'),
+    422: ('Unprocessable Entity', 'The request was well-formed but contains semantic errors'),
+    500: ('Internal Server Error', 'An unexpected error occurred'),
+}
+ERROR_RESPONSE_BODIES = {
+    code: orjson.dumps({'error': error, 'message': message},
+                       option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+    for code, (error, message) in ERROR_MESSAGES.items()
+}
+
+
 def init_error_handlers(app: Flask):
     """Initialize global error handlers"""
     
-    @app.errorhandler(400)
-    def bad_request(error):
-        return jsonify({
-            'error': 'Bad Request',
-            'message': 'The request could not be understood by the server'
-        }), 400
-    
-    @app.errorhandler(401)
-    def unauthorized(error):
-        return jsonify({
-            'error': 'Unauthorized',
-            'message': 'Authentication required'
-        }), 401
-    
-    @app.errorhandler(403)
-    def forbidden(error):
-        return jsonify({
-            'error': 'Forbidden',
-            'message': 'Insufficient permissions'
-        }), 403
+    def make_error_handler(code, body):
+        def error_handler(error):
+            return Response(body, status=code, mimetype='application/json')
+        return error_handler
     
-    @app.errorhandler(404)
-    def not_found(error):
-        return jsonify({
-            'error': 'Not Found',
-            'message': 'The requested resource was not found'
-        }), 404
+    for code, body in ERROR_RESPONSE_BODIES.items():
+        app.register_error_handler(code, make_error_handler(code, body))
     
-    @app.errorhandler(405)
-    def method_not_allowed(error):
-        return jsonify({
-            'error': 'Method Not Allowed',
-            'message': 'The method is not allowed for the requested URL'
-        }), 405
-    
-    @app.errorhandler(413)
-    def payload_too_large(error):
-        return jsonify({
-            'error': 'Payload Too Large',
-            'message': 'The request entity is too large'
-        }), 413
-    
-    @app.errorhandler(422)
-    def unprocessable_entity(error):
-        return jsonify({
-            'error': 'Unprocessable Entity',
-            'message': 'The request was well-formed but contains semantic errors'
-        }), 422
-    
-    @app.errorhandler(500)
-    def internal_server_error(error):
-        return jsonify({
-            'error': 'Internal Server Error',
-            'message': 'An unexpected error occurred'
-        }), 500
+    @app.errorhandler(SQLAlchemyError)
+    def database_error(error):
+        # Routes don't catch their own database errors; discard the failed
+        # transaction here so the session is usable again
+        from auth_models import db
+        db.session.rollback()
+        app.logger.exception(f'Database error on {request.path}: {error}')
+        return Response(ERROR_RESPONSE_BODIES[500], status=500, mimetype='application/json')
     
     return app
 
@@ -3,18 +3,41 @@ Saved Views API Endpoints
 Handles CRUD operations for user-saved dashboard views
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from functools import wraps
+from flask import Blueprint, g, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only
 from datetime import datetime, timezone
-import json
+import orjson
 
 from auth_models import db, User, SavedView
 
 views_bp = Blueprint('views', __name__, url_prefix='/api/views')
 
+# Rows fetched per round trip when listing saved views
+VIEW_LIST_BATCH_SIZE = 200
+
+# Upper bound for ?limit= on the listing/search endpoints
+MAX_VIEW_PAGE_SIZE = 500
+
+# Most views that can be duplicated in one duplicate-batch request
+MAX_DUPLICATE_BATCH_SIZE = 100
+
+# Columns returned for each view by SavedView.to_dict()
+VIEW_LIST_COLUMNS = (
+    SavedView.id, SavedView.name, SavedView.payload_json,
+    SavedView.created_at, SavedView.updated_at
+)
+
 
 def get_current_user():
-    """Helper function to get current authenticated user"""
+    """Helper function to get current authenticated user (looked up once per request)"""
+    if 'current_user' in g:
+        return g.current_user
+    
     current_user_id = get_jwt_identity()
     # Convert string ID back to integer
     try:
@@ -22,329 +45,446 @@ def get_current_user():
     except (ValueError, TypeError):
         return None
     
-    user = User.query.get(user_id)
+    # Handlers only need the id (and the active/role flags)
+    user = db.session.get(
+        User, user_id, options=[load_only(User.id, User.is_active, User.role)]
+    )
     
     if not user or not user.is_active:
-        return None
+        user = None
     
+    # g is per request, so this never outlives the request
+    g.current_user = user
     return user
 
 
-@views_bp.route('', methods=['GET'])
-@jwt_required()
-def list_saved_views():
-    """Get all saved views for the current user"""
-    try:
+def require_active_user(f):
+    """Decorator to require a JWT for an active user, passed to the view as user"""
+    @wraps(f)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
         user = get_current_user()
         if not user:
             return jsonify({'error': 'User not found or inactive'}), 401
-        
-        # Get all saved views for this user, ordered by most recent first
-        saved_views = SavedView.query.filter_by(user_id=user.id)\
-                                     .order_by(SavedView.updated_at.desc())\
-                                     .all()
-        
-        return jsonify({
-            'views': [view.to_dict() for view in saved_views],
-            'count': len(saved_views)
-        }), 200
-        
-    except Exception as e:
-        current_app.logger.error(f'List saved views error: {e}')
-        return jsonify({'error': 'Failed to retrieve saved views'}), 500
+        return f(*args, user=user, **kwargs)
+    return wrapper
+
+
+def get_owned_view(user, view_id):
+    """
+    Look up a saved view by primary key, returning None unless it belongs to user.
+    
+    session.get() checks the identity map before issuing a query.
+    """
+    saved_view = db.session.get(SavedView, view_id)
+    if saved_view is None or saved_view.user_id != user.id:
+        return None
+    return saved_view
+
+
+def serialize_payload(payload):
+    """
+    Serialize a view payload once, compactly, for storage in payload_json.
+    Only JSON objects/arrays are accepted; raises TypeError/ValueError otherwise
+    (orjson.JSONEncodeError is a TypeError).
+    """
+    if not isinstance(payload, (dict, list)):
+        raise TypeError('payload must be a JSON object or array')
+    return orjson.dumps(payload).decode()
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def get_page_args():
+    """
+    Parse optional ?limit= and ?offset= query parameters.
+    Returns (limit, offset), or (None, 0) when no limit is given (unpaginated).
+    Raises ValueError for malformed or negative values.
+    """
+    limit = request.args.get('limit')
+    if limit is None:
+        return None, 0
+    
+    limit = min(int(limit), MAX_VIEW_PAGE_SIZE)
+    offset = int(request.args.get('offset', 0))
+    if limit < 1 or offset < 0:
+        raise ValueError('limit must be positive and offset non-negative')
+    return limit, offset
+
+
+def dialect_insert(model):
+    """INSERT construct for the auth database's dialect (for ON CONFLICT)"""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def view_name_taken(user_id, name, exclude_view_id=None):
+    """Check whether the user already has a view with this name (EXISTS query, no row load)"""
+    query = db.session.query(SavedView.id).filter_by(user_id=user_id, name=name)
+    if exclude_view_id is not None:
+        query = query.filter(SavedView.id != exclude_view_id)
+    return db.session.query(query.exists()).scalar()
+
+
+@views_bp.route('', methods=['GET'])
+@require_active_user
+def list_saved_views(user):
+    """Get all saved views for the current user"""
+    try:
+        limit, offset = get_page_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset parameter'}), 400
+    
+    # Get saved views for this user, ordered by most recent first.
+    # Plain column rows (no ORM objects), fetched in batches
+    rows = db.session.query(*VIEW_LIST_COLUMNS)\
+                     .filter(SavedView.user_id == user.id)\
+                     .order_by(SavedView.updated_at.desc())
+    if limit is not None:
+        # Total comes from the database, not from the page's length
+        total = db.session.query(func.count(SavedView.id))\
+                          .filter(SavedView.user_id == user.id)\
+                          .scalar()
+        rows = rows.limit(limit).offset(offset)
+    rows = rows.yield_per(VIEW_LIST_BATCH_SIZE)
+    
+    # Same shape as SavedView.to_dict()
+    views = [
+        {
+            'id': row.id,
+            'name': row.name,
+            'payload_json': row.payload_json,
+            'created_at': row.created_at.isoformat(),
+            'updated_at': row.updated_at.isoformat()
+        }
+        for row in rows
+    ]
+    
+    response = {
+        'views': views,
+        'count': len(views)
+    }
+    if limit is not None:
+        response.update(count=total, limit=limit, offset=offset)
+    
+    return jsonify(response), 200
 
 
 @views_bp.route('', methods=['POST'])
-@jwt_required()
-def create_saved_view():
+@require_active_user
+def create_saved_view(user):
     """Create a new saved view for the current user"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    # Validate required fields
+    name = data.get('name', '').strip()
+    payload = data.get('payload')
+    
+    if not name:
+        return jsonify({'error': 'View name is required'}), 400
+    
+    if not payload:
+        return jsonify({'error': 'View payload is required'}), 400
+    
+    # Validate name length
+    if len(name) > 255:
+        return jsonify({'error': 'View name too long (max 255 characters)'}), 400
+    
+    # Validate and serialize payload
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        # Validate required fields
-        name = data.get('name', '').strip()
-        payload = data.get('payload')
-        
-        if not name:
-            return jsonify({'error': 'View name is required'}), 400
-        
-        if not payload:
-            return jsonify({'error': 'View payload is required'}), 400
-        
-        # Validate name length
-        if len(name) > 255:
-            return jsonify({'error': 'View name too long (max 255 characters)'}), 400
-        
-        # Check for duplicate names for this user
-        existing_view = SavedView.query.filter_by(
-            user_id=user.id,
-            name=name
-        ).first()
-        
-        if existing_view:
-            return jsonify({'error': 'A view with this name already exists'}), 409
-        
-        # Validate and serialize payload
-        try:
-            payload_json = json.dumps(payload)
-        except (TypeError, ValueError) as e:
-            return jsonify({'error': f'Invalid payload format: {str(e)}'}), 400
-        
-        # Create new saved view
-        saved_view = SavedView(
-            user_id=user.id,
-            name=name,
-            payload_json=payload_json
-        )
-        
-        db.session.add(saved_view)
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Saved view created successfully',
-            'view': saved_view.to_dict()
-        }), 201
-        
-    except Exception as e:
+        payload_json = serialize_payload(payload)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid payload format: {str(e)}'}), 400
+    
+    # Create the view unless the name is taken, in one statement; the
+    # unique (user_id, name) index makes the check race-free. Naming the
+    # conflict target means a database missing that index raises here
+    # rather than inserting a duplicate name
+    saved_view = db.session.scalars(
+        dialect_insert(SavedView)
+        .values(user_id=user.id, name=name, payload_json=payload_json)
+        .on_conflict_do_nothing(index_elements=['user_id', 'name'])
+        .returning(SavedView)
+    ).first()
+    
+    if saved_view is None:
         db.session.rollback()
-        current_app.logger.error(f'Create saved view error: {e}')
-        return jsonify({'error': 'Failed to create saved view'}), 500
+        return jsonify({'error': 'A view with this name already exists'}), 409
+    
+    # Serialize before commit() expires the returned row
+    view_data = saved_view.to_dict()
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Saved view created successfully',
+        'view': view_data
+    }), 201
 
 
 @views_bp.route('/<int:view_id>', methods=['GET'])
-@jwt_required()
-def get_saved_view(view_id):
+@require_active_user
+def get_saved_view(view_id, user):
     """Get a specific saved view by ID (user-scoped)"""
+    # Find the view (must belong to current user)
+    saved_view = get_owned_view(user, view_id)
+    
+    if not saved_view:
+        return jsonify({'error': 'Saved view not found'}), 404
+    
+    # Parse the payload JSON for the response
+    view_data = saved_view.to_dict()
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        # Find the view (must belong to current user)
-        saved_view = SavedView.query.filter_by(
-            id=view_id,
-            user_id=user.id
-        ).first()
-        
-        if not saved_view:
-            return jsonify({'error': 'Saved view not found'}), 404
-        
-        # Parse the payload JSON for the response
-        view_data = saved_view.to_dict()
-        try:
-            view_data['payload'] = json.loads(saved_view.payload_json)
-        except json.JSONDecodeError:
-            view_data['payload'] = {}
-        
-        return jsonify({'view': view_data}), 200
-        
-    except Exception as e:
-        current_app.logger.error(f'Get saved view error: {e}')
-        return jsonify({'error': 'Failed to retrieve saved view'}), 500
+        view_data['payload'] = orjson.loads(saved_view.payload_json)
+    except orjson.JSONDecodeError:
+        view_data['payload'] = {}
+    
+    return jsonify({'view': view_data}), 200
 
 
 @views_bp.route('/<int:view_id>', methods=['PUT'])
-@jwt_required()
-def update_saved_view(view_id):
+@require_active_user
+def update_saved_view(view_id, user):
     """Update a saved view (user-scoped)"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        # Find the view (must belong to current user)
-        saved_view = SavedView.query.filter_by(
-            id=view_id,
-            user_id=user.id
-        ).first()
-        
-        if not saved_view:
-            return jsonify({'error': 'Saved view not found'}), 404
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
+    # Find the view (must belong to current user)
+    saved_view = get_owned_view(user, view_id)
+    
+    if not saved_view:
+        return jsonify({'error': 'Saved view not found'}), 404
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    # Update name if provided
+    if 'name' in data:
+        name = data['name'].strip()
+        if not name:
+            return jsonify({'error': 'View name cannot be empty'}), 400
         
-        # Update name if provided
-        if 'name' in data:
-            name = data['name'].strip()
-            if not name:
-                return jsonify({'error': 'View name cannot be empty'}), 400
-            
-            if len(name) > 255:
-                return jsonify({'error': 'View name too long (max 255 characters)'}), 400
-            
-            # Check for duplicate names (excluding current view)
-            existing_view = SavedView.query.filter_by(
-                user_id=user.id,
-                name=name
-            ).filter(SavedView.id != view_id).first()
-            
-            if existing_view:
-                return jsonify({'error': 'A view with this name already exists'}), 409
-            
-            saved_view.name = name
+        if len(name) > 255:
+            return jsonify({'error': 'View name too long (max 255 characters)'}), 400
         
-        # Update payload if provided
-        if 'payload' in data:
-            payload = data['payload']
-            if not payload:
-                return jsonify({'error': 'View payload cannot be empty'}), 400
-            
-            try:
-                payload_json = json.dumps(payload)
-                saved_view.payload_json = payload_json
-            except (TypeError, ValueError) as e:
-                return jsonify({'error': f'Invalid payload format: {str(e)}'}), 400
+        # Check for duplicate names (excluding current view)
+        if view_name_taken(user.id, name, exclude_view_id=view_id):
+            return jsonify({'error': 'A view with this name already exists'}), 409
         
-        # Update timestamp
-        saved_view.updated_at = datetime.now(timezone.utc)
+        saved_view.name = name
+    
+    # Update payload if provided
+    if 'payload' in data:
+        payload = data['payload']
+        if not payload:
+            return jsonify({'error': 'View payload cannot be empty'}), 400
         
+        try:
+            saved_view.payload_json = serialize_payload(payload)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid payload format: {str(e)}'}), 400
+    
+    # Update timestamp
+    saved_view.updated_at = datetime.now(timezone.utc)
+    
+    # A concurrent request may have taken the name since the check above
+    try:
         db.session.commit()
-        
-        return jsonify({
-            'message': 'Saved view updated successfully',
-            'view': saved_view.to_dict()
-        }), 200
-        
-    except Exception as e:
+    except IntegrityError:
         db.session.rollback()
-        current_app.logger.error(f'Update saved view error: {e}')
-        return jsonify({'error': 'Failed to update saved view'}), 500
+        return jsonify({'error': 'A view with this name already exists'}), 409
+    
+    return jsonify({
+        'message': 'Saved view updated successfully',
+        'view': saved_view.to_dict()
+    }), 200
 
 
 @views_bp.route('/<int:view_id>', methods=['DELETE'])
-@jwt_required()
-def delete_saved_view(view_id):
+@require_active_user
+def delete_saved_view(view_id, user):
     """Delete a saved view (user-scoped)"""
-    try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        # Find the view (must belong to current user)
-        saved_view = SavedView.query.filter_by(
-            id=view_id,
-            user_id=user.id
-        ).first()
-        
-        if not saved_view:
-            return jsonify({'error': 'Saved view not found'}), 404
-        
-        # Store view name for response
-        view_name = saved_view.name
-        
-        # Delete the view
-        db.session.delete(saved_view)
-        db.session.commit()
-        
-        return jsonify({
-            'message': f'Saved view "{view_name}" deleted successfully'
-        }), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f'Delete saved view error: {e}')
-        return jsonify({'error': 'Failed to delete saved view'}), 500
+    # Find the view (must belong to current user)
+    saved_view = get_owned_view(user, view_id)
+    
+    if not saved_view:
+        return jsonify({'error': 'Saved view not found'}), 404
+    
+    # Store view name for response
+    view_name = saved_view.name
+    
+    # Delete the view
+    db.session.delete(saved_view)
+    db.session.commit()
+    
+    return jsonify({
+        'message': f'Saved view "{view_name}" deleted successfully'
+    }), 200
 
 
 @views_bp.route('/search', methods=['GET'])
-@jwt_required()
-def search_saved_views():
+@require_active_user
+def search_saved_views(user):
     """Search saved views by name (user-scoped)"""
+    # Get search query parameter
+    query = request.args.get('q', '').strip()
+    
+    if not query:
+        return jsonify({'error': 'Search query parameter "q" is required'}), 400
+    
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        # Get search query parameter
-        query = request.args.get('q', '').strip()
-        
-        if not query:
-            return jsonify({'error': 'Search query parameter "q" is required'}), 400
-        
-        # Search views by name (case-insensitive)
-        saved_views = SavedView.query.filter_by(user_id=user.id)\
-                                    .filter(SavedView.name.ilike(f'%{query}%'))\
-                                    .order_by(SavedView.updated_at.desc())\
-                                    .all()
-        
-        return jsonify({
-            'views': [view.to_dict() for view in saved_views],
-            'count': len(saved_views),
-            'query': query
-        }), 200
-        
-    except Exception as e:
-        current_app.logger.error(f'Search saved views error: {e}')
-        return jsonify({'error': 'Failed to search saved views'}), 500
+        limit, offset = get_page_args()
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset parameter'}), 400
+    
+    # Case-insensitive prefix search; the anchored LIKE can use the
+    # (user_id, lower(name)) index where a leading % could not
+    pattern = escape_like(query.lower()) + '%'
+    matches = SavedView.query.filter_by(user_id=user.id)\
+                             .filter(func.lower(SavedView.name).like(pattern, escape='\\'))
+    results = matches.order_by(SavedView.updated_at.desc())
+    if limit is not None:
+        total = matches.with_entities(func.count(SavedView.id)).scalar()
+        results = results.limit(limit).offset(offset)
+    saved_views = results.all()
+    
+    response = {
+        'views': [view.to_dict() for view in saved_views],
+        'count': len(saved_views),
+        'query': query
+    }
+    if limit is not None:
+        response.update(count=total, limit=limit, offset=offset)
+    
+    return jsonify(response), 200
 
 
 @views_bp.route('/duplicate/<int:view_id>', methods=['POST'])
-@jwt_required()
-def duplicate_saved_view(view_id):
+@require_active_user
+def duplicate_saved_view(view_id, user):
     """Duplicate an existing saved view with a new name"""
+    # Find the source view (must belong to current user)
+    source_view = get_owned_view(user, view_id)
+    
+    if not source_view:
+        return jsonify({'error': 'Source view not found'}), 404
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    # Get new name for the duplicate
+    new_name = data.get('name', '').strip()
+    if not new_name:
+        # Generate default name
+        new_name = f"{source_view.name} (Copy)"
+    
+    if len(new_name) > 255:
+        return jsonify({'error': 'View name too long (max 255 characters)'}), 400
+    
+    # Check for duplicate names
+    if view_name_taken(user.id, new_name):
+        return jsonify({'error': 'A view with this name already exists'}), 409
+    
+    # Create duplicate view
+    duplicate_view = SavedView(
+        user_id=user.id,
+        name=new_name,
+        payload_json=source_view.payload_json
+    )
+    
+    db.session.add(duplicate_view)
     try:
-        user = get_current_user()
-        if not user:
-            return jsonify({'error': 'User not found or inactive'}), 401
-        
-        # Find the source view (must belong to current user)
-        source_view = SavedView.query.filter_by(
-            id=view_id,
-            user_id=user.id
-        ).first()
-        
-        if not source_view:
-            return jsonify({'error': 'Source view not found'}), 404
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        # Get new name for the duplicate
-        new_name = data.get('name', '').strip()
-        if not new_name:
-            # Generate default name
-            new_name = f"{source_view.name} (Copy)"
-        
-        if len(new_name) > 255:
-            return jsonify({'error': 'View name too long (max 255 characters)'}), 400
-        
-        # Check for duplicate names
-        existing_view = SavedView.query.filter_by(
-            user_id=user.id,
-            name=new_name
-        ).first()
-        
-        if existing_view:
-            return jsonify({'error': 'A view with this name already exists'}), 409
-        
-        # Create duplicate view
-        duplicate_view = SavedView(
-            user_id=user.id,
-            name=new_name,
-            payload_json=source_view.payload_json
-        )
-        
-        db.session.add(duplicate_view)
         db.session.commit()
-        
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'A view with this name already exists'}), 409
+    
+    return jsonify({
+        'message': 'Saved view duplicated successfully',
+        'view': duplicate_view.to_dict()
+    }), 201
+
+
+@views_bp.route('/duplicate-batch', methods=['POST'])
+@require_active_user
+def duplicate_saved_views_batch(user):
+    """Duplicate several saved views at once, appending a suffix to each name"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    ids = data.get('ids')
+    if (not isinstance(ids, list) or not ids
+            or not all(isinstance(view_id, int) for view_id in ids)):
+        return jsonify({'error': 'ids must be a non-empty list of view IDs'}), 400
+    
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_DUPLICATE_BATCH_SIZE:
         return jsonify({
-            'message': 'Saved view duplicated successfully',
-            'view': duplicate_view.to_dict()
-        }), 201
-        
-    except Exception as e:
+            'error': f'Too many views (max {MAX_DUPLICATE_BATCH_SIZE} per request)'
+        }), 400
+    
+    suffix = data.get('suffix', ' (Copy)')
+    if not isinstance(suffix, str) or not suffix.strip():
+        return jsonify({'error': 'suffix must be a non-empty string'}), 400
+    
+    # Find the source views (must belong to current user)
+    source_views = SavedView.query.options(
+        load_only(SavedView.id, SavedView.name, SavedView.payload_json)
+    ).filter(
+        SavedView.user_id == user.id,
+        SavedView.id.in_(ids)
+    ).order_by(SavedView.id).all()
+    
+    if len(source_views) != len(ids):
+        return jsonify({'error': 'Source view not found'}), 404
+    
+    rows = [
+        {
+            'user_id': user.id,
+            'name': f'{view.name}{suffix}',
+            'payload_json': view.payload_json
+        }
+        for view in source_views
+    ]
+    new_names = [row['name'] for row in rows]
+    
+    if any(len(name) > 255 for name in new_names):
+        return jsonify({'error': 'View name too long (max 255 characters)'}), 400
+    
+    # Check all new names for duplicates in one query
+    taken = db.session.query(SavedView.name).filter(
+        SavedView.user_id == user.id,
+        SavedView.name.in_(new_names)
+    ).all()
+    if taken:
+        return jsonify({
+            'error': 'A view with this name already exists',
+            'names': [row.name for row in taken]
+        }), 409
+    
+    # Create all duplicates in a single INSERT
+    try:
+        db.session.bulk_insert_mappings(SavedView, rows)
+        db.session.commit()
+    except IntegrityError:
         db.session.rollback()
-        current_app.logger.error(f'Duplicate saved view error: {e}')
-        return jsonify({'error': 'Failed to duplicate saved view'}), 500
+        return jsonify({'error': 'A view with this name already exists'}), 409
+    
+    created_views = SavedView.query.filter(
+        SavedView.user_id == user.id,
+        SavedView.name.in_(new_names)
+    ).order_by(SavedView.id).all()
+    
+    return jsonify({
+        'message': f'{len(created_views)} saved views duplicated successfully',
+        'views': [view.to_dict() for view in created_views],
+        'count': len(created_views)
+    }), 201
 
 
 # Error handlers
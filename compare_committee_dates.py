@@ -14,73 +14,184 @@ Or run interactively:
 
 import sys
 import os
-import json
-from datetime import datetime, timedelta
+from collections import Counter, namedtuple
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
+import orjson
+
 # Add backend directory to path to import database utilities
 sys.path.insert(0, str(Path(__file__).parent / 'backend'))
 
 from database import get_db_connection, get_database_type
 
+# The database type is fixed for the life of the process, so every query is
+# built once at import with its parameter placeholder (and dialect) baked in
+DB_TYPE = get_database_type()
+P = '%s' if DB_TYPE == 'postgresql' else '?'
+# Timestamp parameters: typed explicitly on Postgres so comparisons against
+# TIMESTAMP columns are range scans on the index with no per-row coercion;
+# SQLite keeps timestamps as TEXT, so they are bound as text (see as_timestamp)
+TS = '%s::timestamp' if DB_TYPE == 'postgresql' else '?'
+
+if DB_TYPE == 'postgresql':
+    # Decode jsonb columns (compliance_scan_metadata.diff_report) with orjson
+    from psycopg2.extras import register_default_jsonb
+    register_default_jsonb(globally=True, loads=orjson.loads)
+
+# States are compared case-insensitively, with missing ones counted as
+# 'unknown'; normalizing them in SQL saves a .lower() per bill in Python
+SQL_BILL_STATE = "LOWER(COALESCE(NULLIF(bc.state, ''), 'unknown')) AS state"
+
+# Latest row per (snapshot, bill) as of two dates, read in (committee_id,
+# bill_id, generated_at DESC) index order - no window function over the history
+if DB_TYPE == 'postgresql':
+    SQL_BILLS_AT_DATES = f'''
+        SELECT DISTINCT ON (snap.s, bc.bill_id)
+               snap.s, bc.bill_id, bc.hearing_date, bc.reported_out,
+               bc.summary_present, bc.votes_present,
+               {SQL_BILL_STATE}, bc.generated_at
+        FROM (VALUES (1, {TS}), (2, {TS})) AS snap(s, d)
+        JOIN bill_compliance bc
+          ON bc.committee_id = {P}
+         AND bc.generated_at <= snap.d
+        ORDER BY snap.s, bc.bill_id, bc.generated_at DESC
+    '''
+else:
+    # SQLite takes the bare columns from the row that has the MAX()
+    SQL_BILLS_AT_DATES = f'''
+        SELECT snap.s, bc.bill_id, bc.hearing_date, bc.reported_out,
+               bc.summary_present, bc.votes_present, {SQL_BILL_STATE},
+               MAX(bc.generated_at) AS generated_at
+        FROM (SELECT 1 AS s, {TS} AS d UNION ALL SELECT 2, {TS}) snap
+        JOIN bill_compliance bc
+          ON bc.committee_id = {P}
+         AND bc.generated_at <= snap.d
+        GROUP BY snap.s, bc.bill_id
+    '''
+
+_SQL_CLOSEST_SCAN = f'''
+    SELECT MAX(generated_at)
+    FROM bill_compliance
+    WHERE committee_id = {P}
+      AND generated_at <= {TS}
+'''
+SQL_CLOSEST_SCAN_DATES = f'SELECT ({_SQL_CLOSEST_SCAN}), ({_SQL_CLOSEST_SCAN})'
 
-def get_bills_at_date(cursor, committee_id, target_date, db_type):
-    """Get bills for a committee at or before a specific date"""
-    placeholder = '%s' if db_type == 'postgresql' else '?'
+SQL_COMMITTEE_NAME = f'SELECT name FROM committees WHERE committee_id = {P}'
+
+SQL_SCAN_METADATA = f'''
+    SELECT scan_date, diff_report, analysis
+    FROM compliance_scan_metadata
+    WHERE committee_id = {P}
+      AND scan_date <= {TS}
+    ORDER BY scan_date DESC
+'''
+SQL_LATEST_SCAN_METADATA = SQL_SCAN_METADATA + '    LIMIT 1\n'
+
+SQL_COMMITTEES = 'SELECT committee_id, name FROM committees ORDER BY committee_id'
+
+# Bills counted per date match the dashboard's deduplication (latest version
+# of each bill_id as of that date), which is every bill first seen on or
+# before the date: a running total of first sightings, computed in one pass
+# over the committee's history
+SQL_SCAN_DATE_COUNTS = f'''
+    WITH first_seen AS (
+        SELECT bill_id, MIN(DATE(generated_at)) AS first_date
+        FROM bill_compliance
+        WHERE committee_id = {P}
+        GROUP BY bill_id
+    ),
+    scan_dates AS (
+        SELECT DISTINCT DATE(generated_at) AS scan_date
+        FROM bill_compliance
+        WHERE committee_id = {P}
+    ),
+    running_counts AS (
+        SELECT sd.scan_date,
+               CAST(SUM(COUNT(fs.bill_id)) OVER (ORDER BY sd.scan_date) AS INTEGER) AS bill_count
+        FROM scan_dates sd
+        LEFT JOIN first_seen fs ON fs.first_date = sd.scan_date
+        GROUP BY sd.scan_date
+    )
+    SELECT scan_date, bill_count
+    FROM running_counts
+    ORDER BY scan_date DESC
+    LIMIT 20
+'''
+
+# Committee names looked up so far; committees are not renamed while the
+# tool runs, so repeated interactive comparisons skip the query
+_committee_names = {}
+
+# Stored diff reports already looked up, keyed by (committee_id, target date,
+# match_dates). Reports don't change once written and this tool never writes
+# them; anything that does must clear this dict
+_diff_reports = {}
+
+# Which side of the compliance line each (lower-cased) state falls on; the
+# rate counts compliant + unknown, so a move between tiers changes it
+COMPLIANCE_TIER = {'compliant': 0, 'unknown': 0, 'non-compliant': 1, 'incomplete': 1}
+
+# One bill_compliance row as of a snapshot (state already lower-cased by SQL)
+Bill = namedtuple('Bill', 'bill_id hearing_date reported_out summary_present '
+                          'votes_present state generated_at')
+
+
+def as_timestamp(value):
+    """Convert a date parameter (datetime or DB-returned string) for binding
     
-    if db_type == 'postgresql':
-        cursor.execute(f'''
-            WITH latest_bills AS (
-                SELECT bc.*,
-                       ROW_NUMBER() OVER (PARTITION BY bc.bill_id ORDER BY bc.generated_at DESC) as rn
-                FROM bill_compliance bc
-                WHERE bc.committee_id = {placeholder}
-                  AND bc.generated_at <= {placeholder}
-            )
-            SELECT bill_id, hearing_date, reported_out, summary_present, 
-                   votes_present, state, generated_at
-            FROM latest_bills
-            WHERE rn = 1
-        ''', (committee_id, target_date))
-    else:
-        cursor.execute(f'''
-            SELECT bc.bill_id, bc.hearing_date, bc.reported_out, bc.summary_present,
-                   bc.votes_present, bc.state, bc.generated_at
-            FROM (
-                SELECT bc.*,
-                       ROW_NUMBER() OVER (PARTITION BY bc.bill_id ORDER BY bc.generated_at DESC) as rn
-                FROM bill_compliance bc
-                WHERE bc.committee_id = {placeholder}
-                  AND bc.generated_at <= {placeholder}
-            ) bc
-            WHERE bc.rn = 1
-        ''', (committee_id, target_date))
+    Postgres gets a datetime; SQLite compares its TEXT timestamps lexically,
+    so it gets the same 'YYYY-MM-DD HH:MM:SS' form they are stored in.
+    """
+    if DB_TYPE == 'postgresql':
+        return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    return str(value)
+
+
+def as_date(value):
+    """Calendar date of a scan/report date (datetime, date or ISO string)
+    
+    Returns None for a missing or unparseable value.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def get_bills_at_dates(cursor, committee_id, date1, date2):
+    """Get bills for a committee at or before each of two dates, in one query
+    
+    Returns (bills1, bills2).
+    """
+    cursor.execute(SQL_BILLS_AT_DATES, (as_timestamp(date1), as_timestamp(date2), committee_id))
     
-    results = cursor.fetchall()
-    bills = []
-    for row in results:
-        bills.append({
-            'bill_id': row[0],
-            'hearing_date': row[1],
-            'reported_out': bool(row[2]) if row[2] is not None else False,
-            'summary_present': bool(row[3]) if row[3] is not None else False,
-            'votes_present': bool(row[4]) if row[4] is not None else False,
-            'state': row[5] or 'unknown',
-            'generated_at': row[6]
-        })
-    return bills
+    # Build the Bills straight off the cursor (no intermediate fetchall() list)
+    snapshots = {1: [], 2: []}
+    for row in cursor:
+        snapshots[row[0]].append(Bill(
+            row[1], row[2], bool(row[3]), bool(row[4]), bool(row[5]), row[6], row[7]
+        ))
+    return snapshots[1], snapshots[2]
 
 
 def calculate_compliance_rate(bills):
     """Calculate compliance rate from a list of bills"""
     if not bills:
-        return 0.0, 0, 0, 0, 0
+        return 0.0, 0, 0, 0, 0, 0, 0
     
+    # Count every state in one pass over the bills
+    state_counts = Counter(bill.state for bill in bills)
     total = len(bills)
-    compliant = sum(1 for bill in bills if bill.get('state', '').lower() == 'compliant')
-    unknown = sum(1 for bill in bills if bill.get('state', '').lower() == 'unknown')
-    non_compliant = sum(1 for bill in bills if bill.get('state', '').lower() == 'non-compliant')
-    incomplete = sum(1 for bill in bills if bill.get('state', '').lower() == 'incomplete')
+    compliant = state_counts['compliant']
+    unknown = state_counts['unknown']
+    non_compliant = state_counts['non-compliant']
+    incomplete = state_counts['incomplete']
     
     # Compliance rate includes compliant + unknown (as per _calculate_compliance_rate)
     compliant_count = compliant + unknown
@@ -89,68 +200,69 @@ def calculate_compliance_rate(bills):
     return compliance_rate, total, compliant, unknown, non_compliant, incomplete, compliant_count
 
 
-def find_closest_scan_date(cursor, committee_id, target_date, db_type):
-    """Find the closest scan date before or at target_date"""
-    placeholder = '%s' if db_type == 'postgresql' else '?'
+def find_closest_scan_dates(cursor, committee_id, date1, date2):
+    """Find the closest scan dates before or at date1 and date2, in one query
     
-    cursor.execute(f'''
-        SELECT MAX(generated_at)
-        FROM bill_compliance
-        WHERE committee_id = {placeholder}
-          AND generated_at <= {placeholder}
-    ''', (committee_id, target_date))
+    Returns (scan_date1, scan_date2); either is None if there is no scan.
+    """
+    cursor.execute(SQL_CLOSEST_SCAN_DATES, (
+        committee_id, as_timestamp(date1), committee_id, as_timestamp(date2)
+    ))
     
     result = cursor.fetchone()
-    return result[0] if result and result[0] else None
+    return (result[0], result[1]) if result else (None, None)
 
 
-def get_committee_name(cursor, committee_id, db_type):
-    """Get committee name from database"""
-    placeholder = '%s' if db_type == 'postgresql' else '?'
+def get_committee_name(cursor, committee_id):
+    """Get committee name from database (cached for the life of the process)"""
+    if committee_id in _committee_names:
+        return _committee_names[committee_id]
     
-    cursor.execute(f'''
-        SELECT name FROM committees WHERE committee_id = {placeholder}
-    ''', (committee_id,))
+    cursor.execute(SQL_COMMITTEE_NAME, (committee_id,))
     
     result = cursor.fetchone()
-    return result[0] if result else committee_id
+    name = result[0] if result else committee_id
+    _committee_names[committee_id] = name
+    return name
+
+
+def load_diff_report(diff_report_json):
+    """Decode a stored diff_report (jsonb columns arrive already decoded)"""
+    if isinstance(diff_report_json, (str, bytes)):
+        return orjson.loads(diff_report_json)
+    return diff_report_json
+
+
+def get_stored_diff_report(cursor, committee_id, target_date, match_dates=None):
+    """Get stored diff_report for a given date, cached for the life of the process
+    
+    See query_stored_diff_report for the arguments.
+    """
+    key = (committee_id, str(target_date), match_dates)
+    if key not in _diff_reports:
+        _diff_reports[key] = query_stored_diff_report(cursor, committee_id, target_date, match_dates)
+    return _diff_reports[key]
 
 
-def get_stored_diff_report(cursor, committee_id, target_date, db_type, match_dates=None):
+def query_stored_diff_report(cursor, committee_id, target_date, match_dates=None):
     """Get stored diff_report from compliance_scan_metadata for a given date
     
     Args:
         match_dates: Optional tuple (prev_date_str, curr_date_str) to find diff_report
                     that matches these exact dates. If None, gets latest scan.
     """
-    placeholder = '%s' if db_type == 'postgresql' else '?'
+    target_ts = as_timestamp(target_date)
     
     # If match_dates provided, try to find diff_report with matching dates
     if match_dates:
         prev_date_str, curr_date_str = match_dates
         
         # Get all scan metadata and check their diff_report dates
-        if db_type == 'postgresql':
-            cursor.execute(f'''
-                SELECT scan_date, diff_report, analysis
-                FROM compliance_scan_metadata
-                WHERE committee_id = {placeholder}
-                  AND scan_date <= {placeholder}
-                ORDER BY scan_date DESC
-            ''', (committee_id, target_date))
-        else:
-            cursor.execute(f'''
-                SELECT scan_date, diff_report, analysis
-                FROM compliance_scan_metadata
-                WHERE committee_id = {placeholder}
-                  AND scan_date <= {placeholder}
-                ORDER BY scan_date DESC
-            ''', (committee_id, target_date))
-        
-        results = cursor.fetchall()
-        
-        # Check each result to find one with matching dates
-        for result in results:
+        cursor.execute(SQL_SCAN_METADATA, (committee_id, target_ts))
+        
+        # Check each result to find one with matching dates, reading rows
+        # off the cursor only until a match is found
+        for result in cursor:
             scan_date = result[0]
             diff_report_json = result[1]
             analysis = result[2]
@@ -159,10 +271,7 @@ def get_stored_diff_report(cursor, committee_id, target_date, db_type, match_dat
                 continue
             
             try:
-                if db_type == 'postgresql':
-                    parsed = diff_report_json if isinstance(diff_report_json, dict) else json.loads(diff_report_json)
-                else:
-                    parsed = json.loads(diff_report_json) if isinstance(diff_report_json, str) else diff_report_json
+                parsed = load_diff_report(diff_report_json)
                 
                 # Check if it's new structure (with daily/weekly/monthly) or old (single diff_report)
                 diff_report = None
@@ -183,28 +292,11 @@ def get_stored_diff_report(cursor, committee_id, target_date, db_type, match_dat
                     if (str(stored_prev)[:10] == prev_date_str[:10] and 
                         str(stored_curr)[:10] == curr_date_str[:10]):
                         return scan_date, diff_report, analysis
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 continue
     
     # Fall back to latest scan if no match found or match_dates not provided
-    if db_type == 'postgresql':
-        cursor.execute(f'''
-            SELECT scan_date, diff_report, analysis
-            FROM compliance_scan_metadata
-            WHERE committee_id = {placeholder}
-              AND scan_date <= {placeholder}
-            ORDER BY scan_date DESC
-            LIMIT 1
-        ''', (committee_id, target_date))
-    else:
-        cursor.execute(f'''
-            SELECT scan_date, diff_report, analysis
-            FROM compliance_scan_metadata
-            WHERE committee_id = {placeholder}
-              AND scan_date <= {placeholder}
-            ORDER BY scan_date DESC
-            LIMIT 1
-        ''', (committee_id, target_date))
+    cursor.execute(SQL_LATEST_SCAN_METADATA, (committee_id, target_ts))
     
     result = cursor.fetchone()
     if not result:
@@ -216,10 +308,7 @@ def get_stored_diff_report(cursor, committee_id, target_date, db_type, match_dat
     
     # Parse diff_report JSON
     try:
-        if db_type == 'postgresql':
-            parsed = diff_report_json if isinstance(diff_report_json, dict) else json.loads(diff_report_json)
-        else:
-            parsed = json.loads(diff_report_json) if isinstance(diff_report_json, str) else diff_report_json
+        parsed = load_diff_report(diff_report_json)
         
         # Check if it's new structure (with daily/weekly/monthly) or old (single diff_report)
         diff_report = None
@@ -233,56 +322,72 @@ def get_stored_diff_report(cursor, committee_id, target_date, db_type, match_dat
                 diff_report = parsed
         
         return scan_date, diff_report, analysis
-    except (json.JSONDecodeError, TypeError):
+    except (orjson.JSONDecodeError, TypeError):
         return scan_date, None, analysis
 
 
+def format_state_changes(changes):
+    """One '  bill_id: from → to' line per (bill_id, from, to) change"""
+    return '\n'.join(f"  {bill_id}: {from_state} → {to_state}"
+                     for bill_id, from_state, to_state in changes)
+
+
 def compare_committees(committee_id, date1_str, date2_str):
     """Compare committee compliance between two dates"""
+    # The report is collected and written in one go rather than ~100 print()
+    # calls, each taking the stdout lock (and flushing when piped to a log)
+    lines = []
+    try:
+        build_comparison(committee_id, date1_str, date2_str, lines.append)
+    finally:
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+
+
+def build_comparison(committee_id, date1_str, date2_str, out):
+    """Compare committee compliance between two dates, passing each report line to out()"""
     # Parse dates
     try:
         date1 = datetime.strptime(date1_str, '%Y-%m-%d')
         date2 = datetime.strptime(date2_str, '%Y-%m-%d')
     except ValueError:
-        print(f"Error: Dates must be in YYYY-MM-DD format")
+        out(f"Error: Dates must be in YYYY-MM-DD format")
         return
     
     if date2 < date1:
-        print("Warning: date2 is before date1. Swapping dates...")
+        out("Warning: date2 is before date1. Swapping dates...")
         date1, date2 = date2, date1
         date1_str, date2_str = date2_str, date1_str
     
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        db_type = get_database_type()
         
         # Get committee name
-        committee_name = get_committee_name(cursor, committee_id, db_type)
+        committee_name = get_committee_name(cursor, committee_id)
         
         # Find closest scan dates
-        print(f"\n{'='*80}")
-        print(f"Committee: {committee_id} - {committee_name}")
-        print(f"{'='*80}\n")
+        out(f"\n{'='*80}")
+        out(f"Committee: {committee_id} - {committee_name}")
+        out(f"{'='*80}\n")
         
-        scan_date1 = find_closest_scan_date(cursor, committee_id, date1, db_type)
-        scan_date2 = find_closest_scan_date(cursor, committee_id, date2, db_type)
+        scan_date1, scan_date2 = find_closest_scan_dates(cursor, committee_id, date1, date2)
         
         if not scan_date1:
-            print(f"Error: No scan data found for {date1_str}")
+            out(f"Error: No scan data found for {date1_str}")
             return
         
         if not scan_date2:
-            print(f"Error: No scan data found for {date2_str}")
+            out(f"Error: No scan data found for {date2_str}")
             return
         
-        print(f"Target Date 1: {date1_str}")
-        print(f"Closest Scan 1: {scan_date1}")
-        print(f"Target Date 2: {date2_str}")
-        print(f"Closest Scan 2: {scan_date2}\n")
+        out(f"Target Date 1: {date1_str}")
+        out(f"Closest Scan 1: {scan_date1}")
+        out(f"Target Date 2: {date2_str}")
+        out(f"Closest Scan 2: {scan_date2}\n")
         
-        # Get bills for each date
-        bills1 = get_bills_at_date(cursor, committee_id, scan_date1, db_type)
-        bills2 = get_bills_at_date(cursor, committee_id, scan_date2, db_type)
+        # Get bills for both dates in one round trip
+        bills1, bills2 = get_bills_at_dates(cursor, committee_id, scan_date1, scan_date2)
         
         # Calculate compliance rates
         rate1, total1, compliant1, unknown1, non_compliant1, incomplete1, compliant_count1 = calculate_compliance_rate(bills1)
@@ -293,44 +398,44 @@ def compare_committees(committee_id, date1_str, date2_str):
         
         # Get stored diff_report from client (what dashboard displays)
         # Try to match the dates we're comparing
-        date1_str_short = str(scan_date1)[:10]
-        date2_str_short = str(scan_date2)[:10]
+        scan_day1 = as_date(scan_date1)
+        scan_day2 = as_date(scan_date2)
         stored_scan_date, stored_diff_report, stored_analysis = get_stored_diff_report(
-            cursor, committee_id, scan_date2, db_type, 
-            match_dates=(date1_str_short, date2_str_short)
+            cursor, committee_id, scan_date2, 
+            match_dates=(scan_day1.isoformat(), scan_day2.isoformat())
         )
         
         # Print statistics
-        print(f"{'='*80}")
-        print(f"DATE 1: {scan_date1}")
-        print(f"{'='*80}")
-        print(f"Total Bills:              {total1}")
-        print(f"Compliant:                {compliant1}")
-        print(f"Unknown:                  {unknown1}")
-        print(f"Non-Compliant:            {non_compliant1}")
-        print(f"Incomplete:               {incomplete1}")
-        print(f"Compliant + Unknown:      {compliant_count1}")
-        print(f"Compliance Rate:          {rate1}%")
-        print(f"\nCalculation: ({compliant_count1} / {total1}) * 100 = {rate1}%")
-        
-        print(f"\n{'='*80}")
-        print(f"DATE 2: {scan_date2}")
-        print(f"{'='*80}")
-        print(f"Total Bills:              {total2}")
-        print(f"Compliant:                {compliant2}")
-        print(f"Unknown:                  {unknown2}")
-        print(f"Non-Compliant:            {non_compliant2}")
-        print(f"Incomplete:               {incomplete2}")
-        print(f"Compliant + Unknown:      {compliant_count2}")
-        print(f"Compliance Rate:          {rate2}%")
-        print(f"\nCalculation: ({compliant_count2} / {total2}) * 100 = {rate2}%")
-        
-        print(f"\n{'='*80}")
-        print(f"DELTA COMPARISON")
-        print(f"{'='*80}")
-        print(f"\n📊 CALCULATED DELTA (from database):")
-        print(f"   Compliance Delta:      {calculated_delta}%")
-        print(f"   Calculation:           {rate2}% - {rate1}% = {calculated_delta}%")
+        out(f"{'='*80}")
+        out(f"DATE 1: {scan_date1}")
+        out(f"{'='*80}")
+        out(f"Total Bills:              {total1}")
+        out(f"Compliant:                {compliant1}")
+        out(f"Unknown:                  {unknown1}")
+        out(f"Non-Compliant:            {non_compliant1}")
+        out(f"Incomplete:               {incomplete1}")
+        out(f"Compliant + Unknown:      {compliant_count1}")
+        out(f"Compliance Rate:          {rate1}%")
+        out(f"\nCalculation: ({compliant_count1} / {total1}) * 100 = {rate1}%")
+        
+        out(f"\n{'='*80}")
+        out(f"DATE 2: {scan_date2}")
+        out(f"{'='*80}")
+        out(f"Total Bills:              {total2}")
+        out(f"Compliant:                {compliant2}")
+        out(f"Unknown:                  {unknown2}")
+        out(f"Non-Compliant:            {non_compliant2}")
+        out(f"Incomplete:               {incomplete2}")
+        out(f"Compliant + Unknown:      {compliant_count2}")
+        out(f"Compliance Rate:          {rate2}%")
+        out(f"\nCalculation: ({compliant_count2} / {total2}) * 100 = {rate2}%")
+        
+        out(f"\n{'='*80}")
+        out(f"DELTA COMPARISON")
+        out(f"{'='*80}")
+        out(f"\n📊 CALCULATED DELTA (from database):")
+        out(f"   Compliance Delta:      {calculated_delta}%")
+        out(f"   Calculation:           {rate2}% - {rate1}% = {calculated_delta}%")
         
         if stored_diff_report:
             stored_delta = stored_diff_report.get('compliance_delta')
@@ -344,164 +449,144 @@ def compare_committees(committee_id, date1_str, date2_str):
             stored_new_summaries = len(stored_diff_report.get('bills_with_new_summaries', []))
             stored_new_votes = len(stored_diff_report.get('bills_with_new_votes', []))
             
-            print(f"\n📥 STORED DELTA (from client/dashboard):")
-            print(f"   Compliance Delta:      {stored_delta}%")
-            print(f"   Time Interval:         {stored_interval}")
-            print(f"   Previous Date:         {stored_prev_date}")
-            print(f"   Current Date:          {stored_curr_date}")
-            print(f"   Stored Scan Date:      {stored_scan_date}")
-            print(f"   New Bills:             {stored_new_bills}")
-            print(f"   New Hearings:          {stored_new_hearings}")
-            print(f"   Reported Out:          {stored_reported_out}")
-            print(f"   New Summaries:         {stored_new_summaries}")
-            print(f"   New Votes:             {stored_new_votes}")
+            out(f"\n📥 STORED DELTA (from client/dashboard):")
+            out(f"   Compliance Delta:      {stored_delta}%")
+            out(f"   Time Interval:         {stored_interval}")
+            out(f"   Previous Date:         {stored_prev_date}")
+            out(f"   Current Date:          {stored_curr_date}")
+            out(f"   Stored Scan Date:      {stored_scan_date}")
+            out(f"   New Bills:             {stored_new_bills}")
+            out(f"   New Hearings:          {stored_new_hearings}")
+            out(f"   Reported Out:          {stored_reported_out}")
+            out(f"   New Summaries:         {stored_new_summaries}")
+            out(f"   New Votes:             {stored_new_votes}")
             
             if stored_analysis:
-                print(f"\n   Analysis:")
+                out(f"\n   Analysis:")
                 analysis_preview = stored_analysis[:200] + ('...' if len(stored_analysis) > 200 else '')
                 for line in analysis_preview.split('\n')[:3]:
-                    print(f"   {line}")
+                    out(f"   {line}")
             
             if stored_delta is not None and calculated_delta != stored_delta:
                 variance = round(stored_delta - calculated_delta, 1)
-                print(f"\n⚠️  VARIANCE DETECTED:")
-                print(f"   Difference:            {variance}%")
-                print(f"   Stored (Dashboard):    {stored_delta}%")
-                print(f"   Calculated (Tool):     {calculated_delta}%")
+                out(f"\n⚠️  VARIANCE DETECTED:")
+                out(f"   Difference:            {variance}%")
+                out(f"   Stored (Dashboard):    {stored_delta}%")
+                out(f"   Calculated (Tool):     {calculated_delta}%")
                 
                 # Check if dates match
-                stored_prev_match = str(scan_date1)[:10] == stored_prev_date if stored_prev_date else False
-                stored_curr_match = str(scan_date2)[:10] == stored_curr_date if stored_curr_date else False
+                stored_prev_match = scan_day1 == as_date(stored_prev_date) if stored_prev_date else False
+                stored_curr_match = scan_day2 == as_date(stored_curr_date) if stored_curr_date else False
                 
-                print(f"\n   Date Comparison:")
-                print(f"     Stored dates:        {stored_prev_date} → {stored_curr_date}")
-                print(f"     Tool dates:          {str(scan_date1)[:10]} → {str(scan_date2)[:10]}")
+                out(f"\n   Date Comparison:")
+                out(f"     Stored dates:        {stored_prev_date} → {stored_curr_date}")
+                out(f"     Tool dates:          {scan_day1} → {scan_day2}")
                 if not (stored_prev_match and stored_curr_match):
-                    print(f"     ⚠️  DATES DON'T MATCH - This explains the variance!")
+                    out(f"     ⚠️  DATES DON'T MATCH - This explains the variance!")
                 else:
-                    print(f"     ✓ Dates match - variance is due to different calculations")
+                    out(f"     ✓ Dates match - variance is due to different calculations")
                 
-                print(f"\n   Possible reasons:")
+                out(f"\n   Possible reasons:")
                 if not (stored_prev_match and stored_curr_match):
-                    print(f"   • PRIMARY ISSUE: Client calculated delta for different dates")
-                    print(f"     The stored diff_report is for {stored_prev_date} → {stored_curr_date}")
-                    print(f"     But the tool calculated for {str(scan_date1)[:10]} → {str(scan_date2)[:10]}")
+                    out(f"   • PRIMARY ISSUE: Client calculated delta for different dates")
+                    out(f"     The stored diff_report is for {stored_prev_date} → {stored_curr_date}")
+                    out(f"     But the tool calculated for {scan_day1} → {scan_day2}")
                 else:
-                    print(f"   • Client used different baseline data or calculation method")
-                    print(f"   • Client's diff_report shows {stored_new_bills} new bills, {stored_new_hearings} hearings")
-                    print(f"     But database shows actual state changes occurred")
-                    print(f"   • Database state may have changed after client submission")
-                    print(f"   • Different deduplication or compliance calculation logic")
+                    out(f"   • Client used different baseline data or calculation method")
+                    out(f"   • Client's diff_report shows {stored_new_bills} new bills, {stored_new_hearings} hearings")
+                    out(f"     But database shows actual state changes occurred")
+                    out(f"   • Database state may have changed after client submission")
+                    out(f"   • Different deduplication or compliance calculation logic")
                 
                 # Show what actually changed in the database
                 if abs(calculated_delta) > 0.1:  # Only show if there's a meaningful change
-                    print(f"\n   What actually changed in database:")
-                    print(f"     • Compliance rate changed by {calculated_delta}%")
-                    print(f"     • This means bills changed state between these dates")
-                    print(f"     • See 'BILL CHANGES' section below for details")
+                    out(f"\n   What actually changed in database:")
+                    out(f"     • Compliance rate changed by {calculated_delta}%")
+                    out(f"     • This means bills changed state between these dates")
+                    out(f"     • See 'BILL CHANGES' section below for details")
             elif stored_delta is not None:
-                print(f"\n✅ DELTAS MATCH: Both show {stored_delta}%")
+                out(f"\n✅ DELTAS MATCH: Both show {stored_delta}%")
         else:
-            print(f"\n⚠️  No stored diff_report found for this date range")
-            print(f"   The dashboard may not have a stored delta for this comparison")
+            out(f"\n⚠️  No stored diff_report found for this date range")
+            out(f"   The dashboard may not have a stored delta for this comparison")
         
-        print(f"\n{'='*80}")
-        print(f"DELTA CALCULATION DETAILS")
-        print(f"{'='*80}")
-        print(f"Calculated Delta:         {calculated_delta}%")
-        print(f"Calculation: {rate2}% - {rate1}% = {calculated_delta}%")
+        out(f"\n{'='*80}")
+        out(f"DELTA CALCULATION DETAILS")
+        out(f"{'='*80}")
+        out(f"Calculated Delta:         {calculated_delta}%")
+        out(f"Calculation: {rate2}% - {rate1}% = {calculated_delta}%")
         
         # Alternative calculation (as user mentioned)
         if total1 == total2:
             non_compliant_count1 = non_compliant1 + incomplete1
             non_compliant_count2 = non_compliant2 + incomplete2
             alt_delta = round(((total1 - non_compliant_count1) / total1 - (total2 - non_compliant_count2) / total2) * 100, 1)
-            print(f"\nAlternative calculation (assuming same total):")
-            print(f"  Previous: ({total1} - {non_compliant_count1}) / {total1} = {(total1 - non_compliant_count1) / total1 * 100:.2f}%")
-            print(f"  Current:  ({total2} - {non_compliant_count2}) / {total2} = {(total2 - non_compliant_count2) / total2 * 100:.2f}%")
-            print(f"  Delta:    {alt_delta}%")
-        
-        # Find bills that changed state
-        bills1_dict = {bill['bill_id']: bill for bill in bills1}
-        bills2_dict = {bill['bill_id']: bill for bill in bills2}
-        
-        state_changes = []
-        new_bills = []
-        removed_bills = []
-        
-        for bill_id, bill2 in bills2_dict.items():
-            if bill_id not in bills1_dict:
-                new_bills.append(bill_id)
-            else:
-                bill1 = bills1_dict[bill_id]
-                if bill1['state'].lower() != bill2['state'].lower():
-                    state_changes.append({
-                        'bill_id': bill_id,
-                        'from': bill1['state'],
-                        'to': bill2['state']
-                    })
-        
-        for bill_id in bills1_dict:
-            if bill_id not in bills2_dict:
-                removed_bills.append(bill_id)
-        
-        # Find bills that dropped below compliance
+            out(f"\nAlternative calculation (assuming same total):")
+            out(f"  Previous: ({total1} - {non_compliant_count1}) / {total1} = {(total1 - non_compliant_count1) / total1 * 100:.2f}%")
+            out(f"  Current:  ({total2} - {non_compliant_count2}) / {total2} = {(total2 - non_compliant_count2) / total2 * 100:.2f}%")
+            out(f"  Delta:    {alt_delta}%")
+        
+        # Find bills that changed state, using set operations on the bill IDs
+        states1 = {bill.bill_id: bill.state for bill in bills1}
+        states2 = {bill.bill_id: bill.state for bill in bills2}
+        
+        new_bills = sorted(states2.keys() - states1.keys())
+        removed_bills = sorted(states1.keys() - states2.keys())
+        # (bill_id, from_state, to_state) tuples
+        state_changes = [
+            (bill_id, states1[bill_id], states2[bill_id])
+            for bill_id in sorted(states1.keys() & states2.keys())
+            if states1[bill_id] != states2[bill_id]
+        ]
+        
+        # Find bills that dropped below / improved compliance (states outside
+        # the two tiers count as neither)
         bills_dropped = [
             change for change in state_changes
-            if change['from'].lower() in ['compliant', 'unknown'] and 
-               change['to'].lower() in ['non-compliant', 'incomplete']
+            if COMPLIANCE_TIER.get(change[1]) == 0 and COMPLIANCE_TIER.get(change[2]) == 1
         ]
-        
-        # Find bills that improved compliance
         bills_improved = [
             change for change in state_changes
-            if change['from'].lower() in ['non-compliant', 'incomplete'] and 
-               change['to'].lower() in ['compliant', 'unknown']
+            if COMPLIANCE_TIER.get(change[1]) == 1 and COMPLIANCE_TIER.get(change[2]) == 0
         ]
         
-        print(f"\n{'='*80}")
-        print(f"BILL CHANGES")
-        print(f"{'='*80}")
-        print(f"New Bills:                {len(new_bills)}")
+        out(f"\n{'='*80}")
+        out(f"BILL CHANGES")
+        out(f"{'='*80}")
+        out(f"New Bills:                {len(new_bills)}")
         if new_bills:
-            print(f"  {', '.join(new_bills[:10])}{'...' if len(new_bills) > 10 else ''}")
+            out(f"  {', '.join(new_bills[:10])}{'...' if len(new_bills) > 10 else ''}")
         
-        print(f"Removed Bills:            {len(removed_bills)}")
+        out(f"Removed Bills:            {len(removed_bills)}")
         if removed_bills:
-            print(f"  {', '.join(removed_bills[:10])}{'...' if len(removed_bills) > 10 else ''}")
+            out(f"  {', '.join(removed_bills[:10])}{'...' if len(removed_bills) > 10 else ''}")
         
-        print(f"Bills Dropped Below Compliance: {len(bills_dropped)}")
+        out(f"Bills Dropped Below Compliance: {len(bills_dropped)}")
         if bills_dropped:
-            for change in bills_dropped[:20]:
-                print(f"  {change['bill_id']}: {change['from']} → {change['to']}")
+            out(format_state_changes(bills_dropped[:20]))
             if len(bills_dropped) > 20:
-                print(f"  ... and {len(bills_dropped) - 20} more")
+                out(f"  ... and {len(bills_dropped) - 20} more")
         
-        print(f"Bills Improved Compliance: {len(bills_improved)}")
+        out(f"Bills Improved Compliance: {len(bills_improved)}")
         if bills_improved:
-            for change in bills_improved[:20]:
-                print(f"  {change['bill_id']}: {change['from']} → {change['to']}")
+            out(format_state_changes(bills_improved[:20]))
             if len(bills_improved) > 20:
-                print(f"  ... and {len(bills_improved) - 20} more")
+                out(f"  ... and {len(bills_improved) - 20} more")
         
-        print(f"\nTotal State Changes:      {len(state_changes)}")
+        out(f"\nTotal State Changes:      {len(state_changes)}")
         if len(state_changes) > 0 and len(state_changes) <= 50:
-            for change in state_changes:
-                print(f"  {change['bill_id']}: {change['from']} → {change['to']}")
+            out(format_state_changes(state_changes))
         elif len(state_changes) > 50:
-            print(f"  (Too many to display - {len(state_changes)} total)")
+            out(f"  (Too many to display - {len(state_changes)} total)")
         
-        print(f"\n{'='*80}\n")
+        out(f"\n{'='*80}\n")
 
 
 def list_committees():
     """List all available committees"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        db_type = get_database_type()
-        placeholder = '%s' if db_type == 'postgresql' else '?'
-        
-        cursor.execute(f'SELECT committee_id, name FROM committees ORDER BY committee_id')
+        cursor.execute(SQL_COMMITTEES)
         committees = cursor.fetchall()
         
         print(f"\n{'='*80}")
@@ -516,66 +601,7 @@ def list_scan_dates(committee_id):
     """List all available scan dates for a committee"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        db_type = get_database_type()
-        placeholder = '%s' if db_type == 'postgresql' else '?'
-        
-        # Use deduplication logic matching the dashboard (latest version of each bill)
-        # For each date, count the latest version of each bill_id as of that date
-        if db_type == 'postgresql':
-            cursor.execute(f'''
-                WITH scan_dates AS (
-                    SELECT DISTINCT DATE(generated_at) as scan_date
-                    FROM bill_compliance
-                    WHERE committee_id = {placeholder}
-                    ORDER BY scan_date DESC
-                    LIMIT 20
-                ),
-                date_bills AS (
-                    SELECT 
-                        sd.scan_date,
-                        bc.bill_id,
-                        ROW_NUMBER() OVER (PARTITION BY sd.scan_date, bc.bill_id ORDER BY bc.generated_at DESC) as rn
-                    FROM scan_dates sd
-                    CROSS JOIN LATERAL (
-                        SELECT bill_id, generated_at
-                        FROM bill_compliance
-                        WHERE committee_id = {placeholder}
-                          AND DATE(generated_at) <= sd.scan_date
-                    ) bc
-                )
-                SELECT scan_date, COUNT(DISTINCT bill_id) as bill_count
-                FROM date_bills
-                WHERE rn = 1
-                GROUP BY scan_date
-                ORDER BY scan_date DESC
-            ''', (committee_id, committee_id))
-        else:
-            # SQLite version - for each date, get latest bills as of that date
-            # This matches the dashboard's deduplication logic
-            cursor.execute(f'''
-                WITH scan_dates AS (
-                    SELECT DISTINCT DATE(generated_at) as scan_date
-                    FROM bill_compliance
-                    WHERE committee_id = {placeholder}
-                    ORDER BY scan_date DESC
-                    LIMIT 20
-                ),
-                all_bills AS (
-                    SELECT 
-                        sd.scan_date,
-                        bc.bill_id,
-                        bc.generated_at,
-                        ROW_NUMBER() OVER (PARTITION BY sd.scan_date, bc.bill_id ORDER BY bc.generated_at DESC) as rn
-                    FROM scan_dates sd
-                    JOIN bill_compliance bc ON bc.committee_id = {placeholder}
-                        AND DATE(bc.generated_at) <= sd.scan_date
-                )
-                SELECT scan_date, COUNT(*) as bill_count
-                FROM all_bills
-                WHERE rn = 1
-                GROUP BY scan_date
-                ORDER BY scan_date DESC
-            ''', (committee_id, committee_id))
+        cursor.execute(SQL_SCAN_DATE_COUNTS, (committee_id, committee_id))
         
         scans = cursor.fetchall()
         
@@ -4,28 +4,30 @@ Development startup script for the Beacon Hill Compliance Dashboard
 Installs dependencies and starts both backend and frontend servers
 """
 
+import asyncio
 import os
+import shutil
 import sys
 import subprocess
-import time
 from pathlib import Path
+from urllib.request import urlopen
+
+# Full path to npm: on Windows it is npm.cmd, which an argv list without a
+# shell doesn't resolve from the bare name
+NPM = shutil.which("npm") or "npm"
 
 def run_command(command, cwd=None, check=True):
-    """Run a command and handle errors gracefully"""
-    print(f"Running: {command}")
+    """Run a command (argv list) with its output streamed straight to the terminal"""
+    print(f"Running: {' '.join(command)}")
     try:
-        result = subprocess.run(command, shell=True, cwd=cwd, check=check, 
-                              capture_output=True, text=True)
-        if result.stdout:
-            print(result.stdout)
-        return result
+        return subprocess.run(command, cwd=cwd, check=check)
     except subprocess.CalledProcessError as e:
-        print(f"Error running command: {command}")
+        print(f"Error running command: {' '.join(command)}")
         print(f"Exit code: {e.returncode}")
-        if e.stdout:
-            print(f"Stdout: {e.stdout}")
-        if e.stderr:
-            print(f"Stderr: {e.stderr}")
+        return None
+    except OSError as e:
+        print(f"Error running command: {' '.join(command)}")
+        print(f"Error: {e}")
         return None
 
 def check_python():
@@ -58,18 +60,16 @@ def setup_backend():
     venv_path = Path("venv")
     if not venv_path.exists():
         print("Creating virtual environment...")
-        run_command(f"{sys.executable} -m venv venv")
+        run_command([sys.executable, "-m", "venv", "venv"])
     
-    # Activate virtual environment and install dependencies
+    # Install dependencies with the virtual environment's interpreter
     if os.name == 'nt':  # Windows
-        pip_path = "venv\\Scripts\\pip"
         python_path = "venv\\Scripts\\python"
     else:  # Unix/Linux/macOS
-        pip_path = "venv/bin/pip"
         python_path = "venv/bin/python"
     
     print("Installing backend dependencies...")
-    run_command(f"{pip_path} install -r backend/requirements.txt")
+    run_command([python_path, "-m", "pip", "install", "-r", "backend/requirements.txt"])
     
     # Check if .env file exists
     env_file = Path("backend/.env")
@@ -101,17 +101,41 @@ def setup_frontend():
         return False
     
     print("Installing frontend dependencies...")
-    result = run_command("npm install", cwd="frontend", check=False)
+    result = run_command([NPM, "install"], cwd="frontend", check=False)
     if result is None or result.returncode != 0:
         print("npm install failed. Trying with --legacy-peer-deps...")
-        result = run_command("npm install --legacy-peer-deps", cwd="frontend", check=False)
+        result = run_command([NPM, "install", "--legacy-peer-deps"], cwd="frontend", check=False)
         if result is None or result.returncode != 0:
             print("Frontend dependency installation failed.")
             return False
     
     return True
 
-def start_servers(python_path):
+BACKEND_HEALTH_URL = "http://localhost:5000/health"
+
+def backend_is_healthy(url=BACKEND_HEALTH_URL):
+    """Return True once the backend answers its health check"""
+    try:
+        with urlopen(url, timeout=0.2):
+            return True
+    except OSError:
+        return False
+
+async def wait_for_backend(process):
+    """Poll the health endpoint until the backend is listening or has exited"""
+    while process.returncode is None:
+        if await asyncio.to_thread(backend_is_healthy):
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+async def relay_output(name, stream):
+    """Copy a server's output to our stdout, prefixed with its name"""
+    async for line in stream:
+        sys.stdout.write(f"[{name}] {line.decode(errors='replace')}")
+        sys.stdout.flush()
+
+async def start_servers(python_path):
     """Start both backend and frontend servers"""
     print("\n=== Starting Servers ===")
     
@@ -119,51 +143,70 @@ def start_servers(python_path):
     print("Starting backend server...")
     backend_env = os.environ.copy()
     backend_env['PYTHONPATH'] = str(Path.cwd())
+    backend_env['PYTHONUNBUFFERED'] = '1'
     
-    backend_process = subprocess.Popen(
-        [python_path, "backend/app.py"],
+    backend_process = await asyncio.create_subprocess_exec(
+        python_path, "backend/app.py",
         env=backend_env,
-        cwd=Path.cwd()
+        cwd=Path.cwd(),
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT
     )
-    
-    # Give backend time to start
-    print("Waiting for backend to start...")
-    time.sleep(3)
-    
-    # Start frontend server
-    print("Starting frontend server...")
-    frontend_process = subprocess.Popen(
-        ["npm", "run", "dev"],
-        cwd="frontend"
-    )
-    
-    print("\n" + "="*50)
-    print("🎉 SERVERS STARTED SUCCESSFULLY!")
-    print("="*50)
-    print(f"Backend:  http://localhost:5000")
-    print(f"Frontend: http://localhost:5173")
-    print(f"Health:   http://localhost:5000/health")
-    print("="*50)
-    print("\nPress Ctrl+C to stop both servers")
+    processes = [backend_process]
+    relays = [asyncio.create_task(relay_output("backend", backend_process.stdout))]
     
     try:
-        # Wait for both processes
-        backend_process.wait()
-        frontend_process.wait()
-    except KeyboardInterrupt:
-        print("\n\nShutting down servers...")
-        backend_process.terminate()
-        frontend_process.terminate()
+        # Start the frontend as soon as the backend is actually listening
+        print("Waiting for backend to start...")
+        if not await wait_for_backend(backend_process):
+            print(f"Backend exited with code {backend_process.returncode} before it became healthy.")
+            return
+        
+        # Start frontend server
+        print("Starting frontend server...")
+        frontend_process = await asyncio.create_subprocess_exec(
+            NPM, "run", "dev",
+            cwd="frontend",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        processes.append(frontend_process)
+        relays.append(asyncio.create_task(relay_output("frontend", frontend_process.stdout)))
         
-        # Wait for graceful shutdown
-        try:
-            backend_process.wait(timeout=5)
-            frontend_process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            backend_process.kill()
-            frontend_process.kill()
+        print("\n" + "="*50)
+        print("🎉 SERVERS STARTED SUCCESSFULLY!")
+        print("="*50)
+        print(f"Backend:  http://localhost:5000")
+        print(f"Frontend: http://localhost:5173")
+        print(f"Health:   {BACKEND_HEALTH_URL}")
+        print("="*50)
+        print("\nPress Ctrl+C to stop both servers")
         
-        print("Servers stopped.")
+        # Wait for both processes
+        await asyncio.gather(*(process.wait() for process in processes))
+    finally:
+        running = [process for process in processes if process.returncode is None]
+        if running:
+            print("\n\nShutting down servers...")
+            for process in running:
+                process.terminate()
+            
+            # Wait for graceful shutdown
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(process.wait() for process in running)), timeout=5
+                )
+            except asyncio.TimeoutError:
+                for process in running:
+                    if process.returncode is None:
+                        process.kill()
+            
+            print("Servers stopped.")
+        
+        # Grandchildren (e.g. Vite under npm) can keep the pipes open
+        for relay in relays:
+            relay.cancel()
+        await asyncio.gather(*relays, return_exceptions=True)
 
 def main():
     """Main startup function"""
@@ -185,7 +228,10 @@ def main():
         sys.exit(1)
     
     # Start both servers
-    start_servers(python_path)
+    try:
+        asyncio.run(start_servers(python_path))
+    except KeyboardInterrupt:
+        pass
 
 if __name__ == "__main__":
     main()
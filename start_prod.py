@@ -4,55 +4,108 @@ Production startup script for Render deployment
 Sets up databases and starts the Flask application
 """
 
+import logging
 import os
+import runpy
 import sys
 from pathlib import Path
 
+from gunicorn.app.base import BaseApplication
+
 # Add the backend directory to Python path
-backend_dir = Path(__file__).parent / 'backend'
+backend_dir = Path(__file__).resolve().parent / 'backend'
 sys.path.insert(0, str(backend_dir))
 
+log = logging.getLogger('startup')
+
+
+class ProductionServer(BaseApplication):
+    """Gunicorn serving an app this process has already built"""
+    
+    def __init__(self, app, config_path):
+        self.application = app
+        self.config_path = config_path
+        super().__init__()
+    
+    def load_config(self):
+        # Same settings file `gunicorn app:app` reads (render.yaml)
+        for key, value in runpy.run_path(self.config_path).items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+    
+    def load(self):
+        return self.application
+
 
 def main():
     """Main production startup"""
-    print("🚀 Beacon Hill Compliance Tracker - Production Startup")
-    print("=" * 55)
+    # LOG_LEVEL=WARNING hides the startup summary below (and create_app's
+    # info logs); warnings and errors still come through
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+                        format='%(asctime)s %(levelname)s %(message)s')
+    
+    # PROFILE_STARTUP=true profiles the startup below (mostly create_app) and
+    # prints the slowest calls before handing over to gunicorn
+    profiler = None
+    if os.getenv('PROFILE_STARTUP', 'false').lower() == 'true':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    log.info("Beacon Hill Compliance Tracker - production startup")
     
     # Check database environment variables
-    print("\n🔍 Environment Configuration:")
     db_url = os.getenv('DATABASE_URL', 'Not set')
     auth_url = os.getenv('AUTH_DATABASE_URL', 'Not set')
-    print(f"   DATABASE_URL: {db_url[:50]}...")
-    print(f"   AUTH_DATABASE_URL: {auth_url[:50]}...")
-    print(f"   FRONTEND_URL: {os.getenv('FRONTEND_URL', 'Not set')}")
-    print(f"   CORS_ORIGINS: {os.getenv('CORS_ORIGINS', 'Not set')}")
-    
-    # Import and create the Flask app (this initializes databases automatically)
-    try:
-        from backend.app import create_app
-        app = create_app()
-        
-        print("✅ Application initialized successfully")
-        
-        # Verify database tables exist
-        with app.app_context():
-            from backend.auth_models import User
-            try:
-                user_count = User.query.count()
-                status = f"✅ Auth database connection verified"
-                print(f"{status} ({user_count} users)")
-            except Exception as e:
-                print(f"⚠️  Auth database warning: {e}")
-        
-        # Get port from environment (Render sets this)
-        port = int(os.getenv('PORT', 5000))
-        
-        print(f"🌐 Starting server on port {port}")
-        app.run(host='0.0.0.0', port=port, debug=False)
-        
-    except Exception as e:
-        print(f"❌ Application startup failed: {e}")
+    log.info("DATABASE_URL: %s...", db_url[:50])
+    log.info("AUTH_DATABASE_URL: %s...", auth_url[:50])
+    log.info("FRONTEND_URL: %s", os.getenv('FRONTEND_URL', 'Not set'))
+    log.info("CORS_ORIGINS: %s", os.getenv('CORS_ORIGINS', 'Not set'))
+    
+    # Get port from environment (Render sets this); checked before the app
+    # is built so a bad value fails fast instead of after a full startup
+    port_env = os.getenv('PORT', '5000')
+    if not port_env.isdigit() or not 0 < int(port_env) < 65536:
+        log.error("Invalid PORT: %r", port_env)
         sys.exit(1)
+    port = int(port_env)
+    log.info("PORT: %d", port)
+    
+    # Run from backend/ (as `cd backend && gunicorn app:app` does), so
+    # relative sqlite:/// paths resolve to the same files either way
+    os.chdir(backend_dir)
+    
+    # Import the Flask app; app.py builds it with create_app() on import, which
+    # initializes the databases. Import it under the same module names app.py
+    # uses, or auth_models would load twice with an unbound SQLAlchemy instance.
+    # Startup errors propagate with their full traceback and a non-zero exit
+    from app import app
+    
+    log.info("Application initialized")
+    
+    # Verify database tables exist
+    with app.app_context():
+        from auth_models import User
+        try:
+            user_count = User.query.count()
+            log.info("Auth database connection verified (%d users)", user_count)
+        except Exception as e:
+            log.warning("Auth database warning: %s", e)
+    
+    # Printed before serving; gunicorn's master runs until shutdown
+    if profiler is not None:
+        import pstats
+        profiler.disable()
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(
+            int(os.getenv('PROFILE_LIMIT', '40')))
+    
+    # Serve with gunicorn rather than Werkzeug's development server, so a
+    # long ingest doesn't hold up /health and dashboard requests. This
+    # process becomes the gunicorn master and workers fork from the app built
+    # above, so it's only built once. Worker settings live in
+    # backend/gunicorn.conf.py, shared with render.yaml
+    log.info("Starting gunicorn on port %d", port)
+    ProductionServer(app, str(backend_dir / 'gunicorn.conf.py')).run()
 
 
 if __name__ == "__main__":